@@ -2,23 +2,44 @@
 A crude implementation of 20 Questions
 Please only stick to nouns... NLTK's WordNet might contain cycles for adjectives and verbs.
 
-Usage:
-`python 20q.py <category>`
+Usage (from the repository root):
+`python -m 20q <category>`
 <category> is the starting WordNet Synset. By default it is `entity.n.01`. 
+The tree is saved under `~/.cache/nlpgames` (or `$NLPGAMES_CACHE`) the first time,
+and rebuilt whenever the WordNet data changes.
 
-`python 20q.py -p <term>`
-Displays the term's location in the hierarchy.
+`python -m 20q -l [<category>]`
+Plays without building the whole tree first: hyponyms are looked up as the game reaches them.
+
+`python -m 20q -s halving [<category>]`
+Asks about groups of siblings that split the remaining words in half, instead of one sibling at a time.
+
+`python -m 20q -d [<category>]`
+Stores synsets with several hypernyms once (as a DAG), instead of copying them under each hypernym.
+
+`python -m 20q -p <term>`
+Displays the term's location in the hierarchy. <term> is a synset label (`waffle.n.01`)
+or a word (`domestic cat`), in which case every sense of the word is shown.
+
+`python -m 20q -b <file>`
+Displays the location of every term in <file> (one per line), or of every line of stdin if <file> is `-`.
+As with `-p`, a term is a synset label or a word.
 
 EJ  2024-10-21
 """
 
-import nltk
-from nltk.corpus import wordnet as wn
-# download WordNet
-try:
-    nltk.data.find('corpora/wordnet.zip')
-except LookupError:
-    nltk.download('wordnet')
+import sys
+import time
+from typing import TYPE_CHECKING
+
+import metrics
+from . import lazy, snapshot
+from .corpus import wordnet
+from .strategies import STRATEGIES, Game
+
+if TYPE_CHECKING:
+    # Only for annotations: importing NLTK is slow, and WordNet is loaded on first use (see `corpus`).
+    import nltk
 
 
 class Node:
@@ -66,7 +87,7 @@ class Node:
             return []
 
 
-def build_tree(root: nltk.corpus.reader.wordnet.Synset) -> Node:
+def build_tree(root: 'nltk.corpus.reader.wordnet.Synset') -> Node:
     """
     Construct a tree from WordNet data.
     UNSAFE for non-nouns.
@@ -96,11 +117,58 @@ def starting_message():
         and it is guessed by the computer, answer 'yes!'.
         
         If you are unsure of the meaning of a word, enter '?'.
+        To look up your own word (or the words starting with some letters), enter '? <word>'.
     '''
     print(msg)
     input('Press enter to begin...')
     
-def play_game(root=wn.synset('entity.n.01')) -> None:
+def load_tree(root='entity.n.01', dag=False):
+    """
+    The tree under `root`, loaded from its snapshot when possible.
+
+    Params:
+        root: Starting Synset, or its label.
+        dag: Store synsets with several hypernyms once, instead of once per hypernym.
+    """
+    label = root if isinstance(root, str) else root.name()
+    # WordNet is only loaded if the snapshot has to be rebuilt.
+    return snapshot.load_or_build(label, dag=dag)
+
+def load_lazy_tree(root='entity.n.01') -> lazy.LazyNode:
+    """
+    The root of a lazily-expanded tree under `root`.
+
+    Params:
+        root: Starting Synset, or its label.
+    """
+    synset = wordnet().synset(root) if isinstance(root, str) else root
+    return lazy.LazyNode(synset, lazy.load_counts(wordnet()))
+
+def print_senses(tree, term: str) -> None:
+    """
+    Prints every sense of `term` with its definition and place in the hierarchy,
+    or the words starting with `term` if it is not a word itself.
+
+    Params:
+        tree: A `CompactTree`, or `None` if there is no snapshot to look words up in.
+        term: A word (e.g. `domestic cat`), a prefix of one, or a synset label.
+    """
+    if tree is None:
+        print('\tWords can only be looked up in an up-to-date tree snapshot (play once without -l to build it).')
+        return
+    senses = tree.resolve(term)
+    for v in senses:
+        node = tree.node(v)
+        print(f'\t{node.label}: "{node.definition}"')
+        print(f'\t\t{" > ".join(tree.path(v))}')
+    if not senses:
+        suggestions = tree.complete(term)
+        if suggestions:
+            print(f'\tDid you mean: {", ".join(suggestions)}?')
+        else:
+            print(f'\t"{term}" is not in the database.')
+
+def play_game(root='entity.n.01', lazy=False, strategy='sibling', dag=False) -> None:
     """
     Plays a game of twenty questions.
     Think of a secret word, and then you will be prompted with a question.
@@ -109,61 +177,111 @@ def play_game(root=wn.synset('entity.n.01')) -> None:
     and the computer guesses it correctly, end your answer with `!`.
 
     Params:
-        root: Starting Synset, 'entity.n.01' by default.
+        root: Starting Synset or its label, 'entity.n.01' by default.
+        lazy: Expand the tree as the game goes, instead of loading all of it first.
+        strategy: How to pick questions; one of `strategies.STRATEGIES`.
+        dag: Share synsets with several hypernyms instead of copying them (ignored if `lazy`).
     """
     
-    tree = build_tree(root)
-    subtree_ind = 0
+    if lazy:
+        tree = load_lazy_tree(root)
+        # Words are looked up in the snapshot, if an up-to-date one has been saved; it is never built here.
+        index = snapshot.load(snapshot.snapshot_path(tree.label))
+        if index is not None and not snapshot.is_current(index.fingerprint):
+            index = None
+    else:
+        index = load_tree(root, dag=dag)
+        tree = index.root
+    game = Game(tree, STRATEGIES[strategy])
     
     starting_message()
     
-    correct = False
-    q_num = 0
-    
-    while not correct:
-        subtrees = sorted(tree.children, key=Node.count, reverse=True)
+    answered = None
+    while True:
+        group = game.question()
+        if answered is not None:
+            metrics.observe('twentyq_turn_seconds', time.perf_counter() - answered, mode='cli')
 
-        if len(subtrees) == 0:
-            print(f'I win in {q_num} guesses! Your word is: {tree.name()}')
-            return
-        
-        if subtree_ind >= len(subtrees):
-            print('I could not guess your word :(')
+        if group is None:
+            word = game.answer_node()
+            if word is None:
+                print('I could not guess your word :(')
+            else:
+                print(f'I win in {game.q_num} guesses! Your word is: {word.name()}')
             return
 
-        current_topic = subtrees[subtree_ind]
-        
-        q_num += 1
-        response = input(f'Question {q_num}: Is it a {current_topic.name()}? ')
+        if len(group) == 1:
+            response = input(f'Question {game.q_num + 1}: Is it a {group[0].name()}? ')
+        else:
+            names = ', '.join(topic.name() for topic in group)
+            response = input(f'Question {game.q_num + 1}: Is it one of: {names}? ')
+        answered = time.perf_counter()
 
-        if response.endswith('!'):
-            print(f'I win in {q_num} guesses! Your word is "{current_topic.name()}"!')
+        if response.endswith('!') and len(group) == 1:
+            print(f'I win in {game.q_num + 1} guesses! Your word is "{group[0].name()}"!')
             return
-        if response.lower() in POS:
-            tree = current_topic
-            subtree_ind = 0
+        if response.lower().rstrip('!') in POS:
+            game.answer(True)
         elif response.lower() in NEG:
-            subtree_ind += 1
+            game.answer(False)
+        elif response.startswith('?') and response[1:].strip():
+            print_senses(index, response[1:].strip())
         else:
-            print(f'\tA "{current_topic.name()}" is "{current_topic.definition}"')
-            q_num -= 1
+            for topic in group:
+                print(f'\tA "{topic.name()}" is "{topic.definition}"')
 
 def find_path(target):
-    """Prints the path to the given word"""
-    tree = build_tree(wn.synset('entity.n.01'))
-    path = tree.find(target, [])
-    if len(path) > 0:
-        for i, word in enumerate(path):
+    """Prints the path to the given synset label, or to every sense of the given word"""
+    tree = load_tree()
+    senses = tree.resolve(target)
+    for n, v in enumerate(senses):
+        if n > 0:
+            print()
+        for i, word in enumerate(tree.path(v)):
             print(f'{" "*i}{word}')
-    else:
+    if len(senses) == 0:
         print(f'{target} was not found in the database.')
+        suggestions = tree.complete(target)
+        if suggestions:
+            print(f'Did you mean: {", ".join(suggestions)}?')
+
+def find_paths(targets) -> None:
+    """Prints the path to each of the given synsets (or to every sense of each word), one per line."""
+    tree = load_tree()
+    for target, path in tree.find_paths(targets):
+        if len(path) > 0:
+            print(' > '.join(path))
+        else:
+            print(f'{target} was not found in the database.', file=sys.stderr)
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m 20q', description='Play Twenty Questions against WordNet.')
+    parser.add_argument('category', nargs='?', default='entity.n.01', help='the starting synset')
+    parser.add_argument('-l', '--lazy', action='store_true',
+                        help='look up hyponyms as the game reaches them instead of loading the whole tree')
+    parser.add_argument('-d', '--dag', action='store_true',
+                        help='store synsets with several hypernyms once instead of copying them')
+    parser.add_argument('-s', '--strategy', choices=sorted(STRATEGIES), default='sibling',
+                        help='how to pick questions')
+    parser.add_argument('-p', '--path', metavar='TERM',
+                        help='display the location in the hierarchy of a synset, or of every sense of a word')
+    parser.add_argument('-b', '--batch', metavar='FILE',
+                        help='display the location of every term in FILE (or stdin, if FILE is -)')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='record timings and write them to FILE at exit (- for stderr; .prom for Prometheus text)')
+    args = parser.parse_args()
+    if args.metrics:
+        metrics.enable(args.metrics)
+
+    if args.path:
+        find_path(args.path)
+    elif args.batch:
+        with (sys.stdin if args.batch == '-' else open(args.batch)) as f:
+            find_paths(line.strip() for line in f if line.strip())
+    else:
+        play_game(root=args.category, lazy=args.lazy, strategy=args.strategy, dag=args.dag)
 
 if __name__ == '__main__':
-    from sys import argv
-
-    if len(argv) == 1:
-        play_game()
-    elif len(argv) == 2:
-        play_game(root=wn.synset(argv[1]))
-    elif argv[1] == '-p':
-        find_path(argv[2])
\ No newline at end of file
+    main()
@@ -0,0 +1,3 @@
+"""
+Twenty Questions against WordNet. Run it from the repository root with `python -m 20q`.
+"""
@@ -0,0 +1,6 @@
+"""`python -m 20q`: plays Twenty Questions (see `20q/20q.py`)."""
+
+from importlib import import_module
+
+# `20q` is not a valid identifier, so the game module can't be named in an import statement.
+import_module('.20q', __package__).main()
@@ -0,0 +1,64 @@
+"""
+Guards the import time of `20q.py`.
+
+Usage:
+`python -m 20q.bench_import [<budget_ms>]`
+Imports `20q.py` in a fresh interpreter under `python -X importtime`, and fails
+if it takes longer than the budget (50ms by default) or imports NLTK.
+"""
+
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 50
+# The module `python -m 20q` runs.
+GAME = '20q.20q'
+
+
+def import_times(module: str) -> dict:
+    """
+    Maps `module` and every module it imported to its cumulative import time in microseconds.
+    Modules the interpreter imported on its own (e.g. from `site`) are left out.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'__import__({module!r})'],
+        cwd=root, check=True, capture_output=True, text=True,
+    )
+    # Lines look like `import time: self [us] | cumulative | imported package`,
+    # indented by depth, and each module comes after everything it imported.
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+
+    end = next(i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == module)
+    start = end
+    while start > 0 and entries[start - 1][0] > 0:
+        start -= 1
+    return {name: cumulative for _, name, cumulative in entries[start:end + 1]}
+
+
+def main(budget_ms: float = DEFAULT_BUDGET_MS) -> int:
+    times = import_times(GAME)
+    total_ms = times[GAME] / 1000
+    print(f'import 20q: {total_ms:.1f}ms (budget {budget_ms}ms)')
+
+    failed = False
+    if total_ms > budget_ms:
+        print('FAIL: over budget. Slowest imports:')
+        for name, us in sorted(times.items(), key=lambda item: -item[1])[:10]:
+            print(f'  {us / 1000:8.1f}ms  {name}')
+        failed = True
+    if 'nltk' in times:
+        print('FAIL: importing 20q imports NLTK; load it in corpus.wordnet() instead.')
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*map(float, sys.argv[1:2])))
@@ -0,0 +1,77 @@
+"""
+Compares the `Node` tree with the array-backed `CompactTree`, and with the
+`CompactTree` DAG that stores synsets with several hypernyms only once.
+
+Usage:
+`python -m 20q.bench_tree [<category>]`
+Builds the tree under <category> (`entity.n.01` by default) each way,
+each in a fresh process, and reports the number of nodes, build time, peak RSS, and the latency
+of choosing the next question at the root (the work `play_game` does every turn).
+"""
+
+import importlib
+import resource
+import subprocess
+import sys
+import time
+
+from .compact import build_compact_tree
+
+IMPLEMENTATIONS = ('node', 'compact', 'dag')
+TURN_REPEATS = 5
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process, in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+def turn_latency(game, tree) -> float:
+    """Mean seconds to rank the children of the root, as `play_game` does per turn."""
+    start = time.perf_counter()
+    for _ in range(TURN_REPEATS):
+        if isinstance(tree, game.Node):
+            sorted(tree.children, key=game.Node.count, reverse=True)
+        else:
+            tree.root.children
+    return (time.perf_counter() - start) / TURN_REPEATS
+
+
+def run_one(impl: str, category: str) -> None:
+    """Build one tree and print `impl nodes build_seconds rss_before rss_after turn_seconds`."""
+    game = importlib.import_module('.20q', __package__)
+    root = game.wordnet().synset(category)
+    # Make sure the corpus is loaded before timing.
+    root.hyponyms()
+    before = peak_rss_mb()
+
+    start = time.perf_counter()
+    if impl == 'node':
+        tree = game.build_tree(root)
+    else:
+        tree = build_compact_tree(root, dag=impl == 'dag')
+    elapsed = time.perf_counter() - start
+
+    after = peak_rss_mb()
+    nodes = tree.count() if impl == 'node' else len(tree)
+    print(impl, nodes, elapsed, before, after, turn_latency(game, tree))
+
+
+def main(category: str = 'entity.n.01') -> None:
+    print(f'{"tree":<10}{"nodes":>10}{"build (s)":>12}{"tree RSS (MB)":>16}{"peak RSS (MB)":>16}{"root turn (ms)":>16}')
+    for impl in IMPLEMENTATIONS:
+        out = subprocess.run(
+            [sys.executable, '-m', __spec__.name, '--one', impl, category],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        nodes, elapsed, before, after, turn = map(float, out[-5:])
+        print(f'{impl:<10}{nodes:>10.0f}{elapsed:>12.3f}{after - before:>16.1f}{after:>16.1f}{turn * 1000:>16.3f}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--one':
+        run_one(sys.argv[2], sys.argv[3])
+    else:
+        main(*sys.argv[1:2])
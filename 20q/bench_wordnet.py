@@ -0,0 +1,77 @@
+"""
+Benchmark for the `Node` tree operations on fixed WordNet roots, for comparing commits.
+
+For each root, times:
+
+- build_tree:  building the `Node` tree from WordNet (WordNet itself is loaded beforehand)
+- count:       `Node.count` over the whole tree
+- find:        `Node.find` for the last synset in the tree (the worst case) and for a missing one
+- find_path:   `find_path` for the same synsets, i.e. loading the snapshot and searching it
+- lemma:       looking up the last synset's first lemma, and completing its first three letters,
+               in the snapshot's lemma index
+
+Usage:
+`python -m 20q.bench_wordnet [--roots <label> ...] [--repeat <n>] [--json <file>]`
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+
+from bench import timed
+
+ROOTS = ('dog.n.01', 'animal.n.01', 'entity.n.01')
+MISSING = 'no_such_synset.n.01'
+
+
+def last_label(node) -> str:
+    """The label of the last node in depth-first order, which `Node.find` reaches last."""
+    while node.children:
+        node = node.children[-1]
+    return node.label
+
+
+def bench_root(game, label: str, repeat: int) -> dict:
+    root = game.wordnet().synset(label)
+    # Make sure the corpus is loaded before timing.
+    root.hyponyms()
+    results = {'build_tree': timed(lambda: game.build_tree(root), repeat)}
+    tree = game.build_tree(root)
+    results['nodes'] = tree.count()
+    results['count'] = timed(tree.count, repeat)
+    target = last_label(tree)
+    results['find'] = timed(lambda: (tree.find(target, []), tree.find(MISSING, [])), repeat)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The first call may build the snapshot; only time loading it.
+        game.find_path(target)
+        results['find_path'] = timed(lambda: (game.find_path(target), game.find_path(MISSING)), repeat)
+    index = game.load_tree()
+    word = game.wordnet().synset(target).lemma_names()[0]
+    results['lemma'] = timed(lambda: (index.senses(word), index.complete(word[:3])), repeat)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the 20q tree on fixed WordNet roots.')
+    parser.add_argument('--roots', nargs='+', default=ROOTS, metavar='LABEL')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', metavar='FILE', help='also write the results to this file')
+    args = parser.parse_args()
+
+    game = importlib.import_module('.20q', __package__)
+    results = {}
+    print(f'{"root":<16}{"nodes":>8}{"build (ms)":>12}{"count (ms)":>12}{"find (ms)":>12}'
+          f'{"find_path (ms)":>16}{"lemma (us)":>12}')
+    for label in args.roots:
+        r = results[label] = bench_root(game, label, args.repeat)
+        print(f'{label:<16}{r["nodes"]:>8}{r["build_tree"]["median"] * 1000:>12.1f}'
+              f'{r["count"]["median"] * 1000:>12.2f}{r["find"]["median"] * 1000:>12.2f}'
+              f'{r["find_path"]["median"] * 1000:>16.2f}{r["lemma"]["median"] * 1e6:>12.1f}')
+
+    if args.json:
+        config = {k: v for k, v in vars(args).items() if k != 'json'}
+        report = {'suite': 'wordnet', 'config': config, 'results': results}
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
@@ -0,0 +1,530 @@
+"""
+A compact, array-backed version of the 20 Questions hyponym tree.
+
+`Node` keeps one Python object (plus a label, a definition and a child list)
+for every hyponym under the root, which adds up quickly for `entity.n.01`.
+`CompactTree` instead numbers every node with an integer id and stores the
+structure in a few flat `array`s:
+
+    child_offsets   node id -> start of its children in `children` (CSR style)
+    children        child node ids, grouped by parent, largest subtree first
+    synsets         node id -> synset id
+    sizes           node id -> number of nodes in its subtree
+    size_prefix     running total of `sizes[c]` over `children`, so the combined
+                    size of any run of siblings is one subtraction
+    parents         node id -> parent node id (the root is its own parent)
+    label_index     open-addressing hash table from label to the first node
+                    with that label, so `find` just walks up `parents`
+    path_counts     node id -> number of root-to-leaf-style paths below it, i.e. what
+                    `Node.count` returns
+
+WordNet nouns can have several hypernyms. By default such a synset (and everything
+under it) is copied under each parent, exactly like `build_tree`. With `dag=True`
+each synset is stored once and shared between its parents: `sizes` then counts
+unique descendants, `path_counts` still counts every copy, and `parents` holds the
+parent through which the synset was first reached.
+
+Labels and definitions are kept once per synset (not once per node) in
+`StringTable`s, which pack all the strings into a single UTF-8 blob.
+
+`LemmaIndex` maps the words players use ("waffle", "domestic cat") to their synsets:
+a sorted `StringTable` of every lemma in the tree, searched by bisection, so looking up
+a lemma or every lemma starting with a prefix never touches the tree itself.
+
+`CompactNode` is a lightweight view of one node, with the same
+`name`/`defn`/`count`/`find` surface as `Node`.
+"""
+
+import time
+from array import array
+from bisect import bisect_left
+from zlib import crc32
+
+import metrics
+
+# Marks an empty slot in `label_index`.
+EMPTY = 0xFFFFFFFF
+
+
+class StringTable:
+    """
+    A read-only list of strings packed into one UTF-8 blob.
+    String `i` is `blob[offsets[i]:offsets[i+1]]`.
+    """
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def build(cls, strings) -> 'StringTable':
+        """Pack an iterable of strings into a new table."""
+        offsets = array('I', [0])
+        blob = bytearray()
+        for s in strings:
+            blob += s.encode('utf-8')
+            offsets.append(len(blob))
+        return cls(offsets, bytes(blob))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+
+def normalize_lemma(lemma: str) -> str:
+    """The form lemmas are indexed under: `Domestic_Cat` -> `domestic cat`."""
+    return ' '.join(lemma.replace('_', ' ').lower().split())
+
+
+class LemmaIndex:
+    """
+    Lemma -> synset ids, for looking synsets up by the words players use.
+
+    `lemmas` holds every lemma of every synset (see `normalize_lemma`), sorted by their
+    UTF-8 bytes, so a lemma, or the run of lemmas starting with a prefix, is found by bisection.
+    The synset ids of lemma `i` are `senses[sense_offsets[i]:sense_offsets[i+1]]`,
+    the synsets named after the lemma first, in sense order.
+    """
+    def __init__(self, lemmas: StringTable, sense_offsets, senses):
+        self.lemmas = lemmas
+        self.sense_offsets = sense_offsets
+        self.senses = senses
+
+    @classmethod
+    def build(cls, lemma_names, labels) -> 'LemmaIndex':
+        """
+        Params:
+            lemma_names: The lemma names (`Synset.lemma_names()`) of each synset id.
+            labels: The label of each synset id.
+        """
+        by_lemma = {}
+        for sid, names in enumerate(lemma_names):
+            for name in names:
+                sids = by_lemma.setdefault(normalize_lemma(name), [])
+                if sid not in sids:
+                    sids.append(sid)
+
+        def sense_order(lemma):
+            # `dog.n.01`, `dog.n.02`... for `dog`, then the synsets it is only a synonym in.
+            return lambda sid: (normalize_lemma(labels[sid].rsplit('.', 2)[0]) != lemma, labels[sid])
+
+        lemmas = sorted(by_lemma, key=lambda lemma: lemma.encode('utf-8'))
+        sense_offsets = array('I', [0])
+        senses = array('I')
+        for lemma in lemmas:
+            senses.extend(sorted(by_lemma[lemma], key=sense_order(lemma)))
+            sense_offsets.append(len(senses))
+        return cls(StringTable.build(lemmas), sense_offsets, senses)
+
+    def __len__(self) -> int:
+        return len(self.lemmas)
+
+    def _key(self, i: int) -> bytes:
+        return bytes(self.lemmas.blob[self.lemmas.offsets[i]:self.lemmas.offsets[i + 1]])
+
+    def synsets(self, lemma: str) -> list:
+        """The synset ids of every sense of `lemma`, or `[]` if it is not a lemma."""
+        key = normalize_lemma(lemma).encode('utf-8')
+        i = bisect_left(range(len(self)), key, key=self._key)
+        if i < len(self) and self._key(i) == key:
+            return list(self.senses[self.sense_offsets[i]:self.sense_offsets[i + 1]])
+        return []
+
+    def complete(self, prefix: str, limit: int = 10) -> list:
+        """Up to `limit` lemmas starting with `prefix`, in sorted order."""
+        key = normalize_lemma(prefix).encode('utf-8')
+        found = []
+        i = bisect_left(range(len(self)), key, key=self._key)
+        while i < len(self) and len(found) < limit and self._key(i).startswith(key):
+            found.append(self.lemmas[i])
+            i += 1
+        return found
+
+
+class CompactTree:
+    """
+    A hyponym tree (or DAG) stored as flat integer arrays.
+    Node 0 is the root. Node ids are assigned breadth-first.
+    """
+    def __init__(self, child_offsets, children, synsets, sizes, size_prefix, path_counts, parents,
+                 label_index, labels, definitions, definition_ids, lemmas: LemmaIndex):
+        self.child_offsets = child_offsets
+        self.children = children
+        self.synsets = synsets
+        self.sizes = sizes
+        self.size_prefix = size_prefix
+        self.path_counts = path_counts
+        self.parents = parents
+        self.label_index = label_index
+        self.labels = labels
+        self.definitions = definitions
+        self.definition_ids = definition_ids
+        self.lemmas = lemmas
+
+    def __len__(self) -> int:
+        return len(self.synsets)
+
+    @property
+    def root(self) -> 'CompactNode':
+        return CompactNode(self, 0)
+
+    def node(self, node_id: int) -> 'CompactNode':
+        return CompactNode(self, node_id)
+
+    def label(self, node_id: int) -> str:
+        return self.labels[self.synsets[node_id]]
+
+    def definition(self, node_id: int) -> str:
+        return self.definitions[self.definition_ids[self.synsets[node_id]]]
+
+    def child_ids(self, node_id: int):
+        return self.children[self.child_offsets[node_id]:self.child_offsets[node_id + 1]]
+
+    def subtree_size(self, node_id: int) -> int:
+        """The number of distinct nodes under (and including) `node_id`."""
+        return self.sizes[node_id]
+
+    def prefix_size(self, node_id: int, i: int) -> int:
+        """The combined size of the first `i` children of `node_id`."""
+        offset = self.child_offsets[node_id]
+        return self.size_prefix[offset + i] - self.size_prefix[offset]
+
+    def lookup(self, label: str) -> int:
+        """The id of the first (shallowest) node labelled `label`, or `None`."""
+        mask = len(self.label_index) - 1
+        slot = crc32(label.encode('utf-8')) & mask
+        while True:
+            v = self.label_index[slot]
+            if v == EMPTY:
+                return None
+            if self.label(v) == label:
+                return v
+            slot = (slot + 1) & mask
+
+    def path(self, node_id: int, start: int = 0) -> list:
+        """
+        The labels on the path from `start` down to `node_id`,
+        or `[]` if `node_id` is not under `start`.
+        """
+        path = [self.label(node_id)]
+        while node_id != start:
+            parent = self.parents[node_id]
+            if parent == node_id:
+                return []
+            node_id = parent
+            path.append(self.label(node_id))
+        path.reverse()
+        return path
+
+    def find(self, target: str, start: int = 0) -> list:
+        """
+        The labels on the path from `start` to a node labelled `target`,
+        or `[]` if there is no such node.
+        """
+        v = self.lookup(target)
+        if v is None:
+            return []
+        path = self.path(v, start)
+        if path or start == 0:
+            return path
+        # A synset with several hypernyms can also occur under `start`, away from its first occurrence.
+        return self._search(target, start)
+
+    def senses(self, lemma: str) -> list:
+        """The ids of the first node of each sense of `lemma` (e.g. `domestic cat`), most common first."""
+        return [self.lookup(self.labels[sid]) for sid in self.lemmas.synsets(lemma)]
+
+    def complete(self, prefix: str, limit: int = 10) -> list:
+        """Up to `limit` lemmas in the tree starting with `prefix`."""
+        return self.lemmas.complete(prefix, limit)
+
+    def resolve(self, term: str) -> list:
+        """The node ids `term` refers to: the synset if it is a label (e.g. `waffle.n.01`), else its senses."""
+        v = self.lookup(term)
+        return [v] if v is not None else self.senses(term)
+
+    def find_paths(self, targets) -> list:
+        """
+        A `(target, path from the root)` pair for each synset label in `targets`, in order,
+        or one for each sense of a word; the path is `[]` if the target is not in the tree.
+        """
+        pairs = []
+        for target in targets:
+            nodes = self.resolve(target)
+            pairs.extend((target, self.path(v)) for v in nodes)
+            if not nodes:
+                pairs.append((target, []))
+        return pairs
+
+    def _search(self, target: str, start: int) -> list:
+        """Depth-first search for `target` under `start`."""
+        # Each stack entry is (node id, depth); `path` holds the labels above the current node.
+        path = []
+        stack = [(start, 0)]
+        while stack:
+            v, depth = stack.pop()
+            del path[depth:]
+            label = self.label(v)
+            path.append(label)
+            if label == target:
+                return path
+            stack.extend((c, depth + 1) for c in reversed(self.child_ids(v)))
+        return []
+
+
+class CompactNode:
+    """A view of one node of a `CompactTree`, mirroring the `Node` interface."""
+    __slots__ = ('tree', 'id')
+
+    def __init__(self, tree: CompactTree, node_id: int):
+        self.tree = tree
+        self.id = node_id
+
+    def __eq__(self, other):
+        return isinstance(other, CompactNode) and self.tree is other.tree and self.id == other.id
+
+    def __hash__(self):
+        return hash((id(self.tree), self.id))
+
+    def __repr__(self):
+        return f'CompactNode({self.label!r})'
+
+    @property
+    def label(self) -> str:
+        return self.tree.label(self.id)
+
+    @property
+    def definition(self) -> str:
+        return self.tree.definition(self.id)
+
+    @property
+    def children(self) -> list:
+        """The hyponyms of this node, largest subtree first."""
+        return [CompactNode(self.tree, c) for c in self.tree.child_ids(self.id)]
+
+    def num_children(self) -> int:
+        return self.tree.child_offsets[self.id + 1] - self.tree.child_offsets[self.id]
+
+    def child(self, i: int) -> 'CompactNode':
+        """The `i`th child, counting from the largest."""
+        return CompactNode(self.tree, self.tree.children[self.tree.child_offsets[self.id] + i])
+
+    def prefix_size(self, i: int) -> int:
+        """The combined size of the first `i` children."""
+        return self.tree.prefix_size(self.id, i)
+
+    def name(self) -> str:
+        """The nicely-formatted name of this synset."""
+        return self.label.rsplit('.')[0].replace('_', ' ')
+
+    def defn(self) -> str:
+        """The definition of this synset."""
+        return self.definition
+
+    def count(self) -> int:
+        """
+        The number of nodes in this tree.
+        Returns 1 if this is a leaf (no known hyponyms).
+        """
+        return self.tree.subtree_size(self.id)
+
+    def find(self, target, path):
+        """
+        Traces the path to a certain word.
+
+        Params:
+            target: The string name of the desired node
+            path: A list of names representing the steps in the tree. Should be `[]` on invocation.
+        """
+        found = self.tree.find(target, self.id)
+        return path + found if found else []
+
+
+def build_compact_tree(root, dag: bool = False) -> CompactTree:
+    """
+    Construct a `CompactTree` from WordNet data.
+    UNSAFE for non-nouns.
+
+    Params:
+        root: The starting Synset.
+        dag: Store each synset once, shared between all of its hypernyms,
+            instead of copying it under each one.
+    Returns:
+        The fully-populated tree.
+    """
+    synset_ids = {}
+    labels = []
+    lemma_names = []
+    definition_ids = array('I')
+    definition_index = {}
+    # Synsets with several hypernyms are reached more than once; only ask WordNet once.
+    hyponyms = []
+
+    synsets = array('I')
+    child_offsets = array('I', [0])
+    children = array('I')
+    parents = array('I', [0])
+
+    start = time.perf_counter()
+    # Breadth-first, so `queue[i]` is the synset id of node `i`.
+    # In a DAG every synset is queued once, so node ids and synset ids coincide.
+    queue = [_intern(root, synset_ids, labels, lemma_names, definition_index, definition_ids, hyponyms)]
+    i = 0
+    while i < len(queue):
+        sid = queue[i]
+        synsets.append(sid)
+        for child in hyponyms[sid]:
+            n_synsets = len(labels)
+            cid = _intern(child, synset_ids, labels, lemma_names, definition_index, definition_ids, hyponyms)
+            if not dag:
+                children.append(len(queue))
+                parents.append(i)
+                queue.append(cid)
+            else:
+                children.append(cid)
+                if cid == n_synsets:
+                    parents.append(i)
+                    queue.append(cid)
+        child_offsets.append(len(children))
+        i += 1
+    walked = time.perf_counter()
+
+    if dag:
+        order = _post_order(child_offsets, children)
+        path_counts = _path_counts(child_offsets, children, order)
+        sizes = _unique_counts(child_offsets, children, order)
+    else:
+        # Ids are breadth-first, so every child has a larger id than its parent.
+        order = range(len(synsets) - 1, -1, -1)
+        sizes = path_counts = _path_counts(child_offsets, children, order)
+    _sort_children(child_offsets, children, sizes)
+    counted = time.perf_counter()
+
+    size_prefix = array('Q', [0])
+    for c in children:
+        size_prefix.append(size_prefix[-1] + sizes[c])
+    label_index = _index_labels(synsets, labels)
+    definitions = sorted(definition_index, key=definition_index.get)
+    tree = CompactTree(
+        child_offsets, children, synsets, sizes, size_prefix, path_counts, parents, label_index,
+        StringTable.build(labels), StringTable.build(definitions), definition_ids,
+        LemmaIndex.build(lemma_names, labels),
+    )
+    if metrics.ENABLED:
+        metrics.observe('tree_build_seconds', walked - start, phase='walk')
+        metrics.observe('tree_build_seconds', counted - walked, phase='count')
+        metrics.observe('tree_build_seconds', time.perf_counter() - counted, phase='index')
+    return tree
+
+
+def _post_order(child_offsets, children) -> list:
+    """The node ids of a DAG, each after all of its descendants."""
+    n = len(child_offsets) - 1
+    visited = bytearray(n)
+    order = []
+    # Each stack entry is (node id, whether its children have been pushed).
+    stack = [(0, False)]
+    while stack:
+        v, expanded = stack.pop()
+        if expanded:
+            order.append(v)
+            continue
+        if visited[v]:
+            continue
+        visited[v] = 1
+        stack.append((v, True))
+        stack.extend((c, False) for c in children[child_offsets[v]:child_offsets[v + 1]] if not visited[c])
+    return order
+
+
+def _path_counts(child_offsets, children, order) -> array:
+    """`Node.count` for every node, in one pass over `order` (children before parents)."""
+    counts = array('I', [1]) * (len(child_offsets) - 1)
+    for v in order:
+        lo, hi = child_offsets[v], child_offsets[v + 1]
+        if hi > lo:
+            counts[v] += sum(counts[c] for c in children[lo:hi])
+    return counts
+
+
+def _unique_counts(child_offsets, children, order) -> array:
+    """
+    The number of distinct descendants (including itself) of every node in a DAG.
+
+    Only nodes at or below a synset with several parents can be reached twice, so
+    only those ("shared" nodes) are tracked individually, as bits of a Python int.
+    Every other node is reached by exactly one path and can simply be added up.
+    """
+    n = len(child_offsets) - 1
+    indegree = array('I', [0]) * n
+    for c in children:
+        indegree[c] += 1
+
+    # Parents come before children in reversed post-order.
+    shared_bit = {}
+    for v in reversed(order):
+        if v in shared_bit or indegree[v] > 1:
+            shared_bit.setdefault(v, len(shared_bit))
+            for c in children[child_offsets[v]:child_offsets[v + 1]]:
+                shared_bit.setdefault(c, len(shared_bit))
+
+    unshared = array('I', [0]) * n
+    bits = {}
+    counts = array('I', [0]) * n
+    for v in order:
+        kids = children[child_offsets[v]:child_offsets[v + 1]]
+        b = 0
+        for c in kids:
+            b |= bits.get(c, 0)
+        if v in shared_bit:
+            b |= 1 << shared_bit[v]
+        else:
+            unshared[v] = 1 + sum(unshared[c] for c in kids)
+        if b:
+            bits[v] = b
+        counts[v] = unshared[v] + b.bit_count()
+    return counts
+
+
+def _sort_children(child_offsets, children, sizes) -> None:
+    """Sort each node's children by size, largest first, in place."""
+    for v in range(len(child_offsets) - 1):
+        lo, hi = child_offsets[v], child_offsets[v + 1]
+        if hi - lo > 1:
+            children[lo:hi] = array('I', sorted(children[lo:hi], key=sizes.__getitem__, reverse=True))
+
+
+def _index_labels(synsets, labels) -> array:
+    """
+    Build the label hash table: a power of two at least twice the number of labels,
+    with linear probing. Each label points to its first (breadth-first) node.
+    """
+    size = 1
+    while size < 2 * len(labels):
+        size *= 2
+    index = array('I', [EMPTY]) * size
+    seen = set()
+    for v, sid in enumerate(synsets):
+        if sid in seen:
+            continue
+        seen.add(sid)
+        slot = crc32(labels[sid].encode('utf-8')) & (size - 1)
+        while index[slot] != EMPTY:
+            slot = (slot + 1) & (size - 1)
+        index[slot] = v
+    return index
+
+
+def _intern(synset, synset_ids, labels, lemma_names, definition_index, definition_ids, hyponyms) -> int:
+    """The synset id of `synset`, registering it in the tables if it is new."""
+    name = synset.name()
+    sid = synset_ids.get(name)
+    if sid is None:
+        sid = synset_ids[name] = len(labels)
+        labels.append(name)
+        lemma_names.append(synset.lemma_names())
+        definition = synset.definition()
+        definition_ids.append(definition_index.setdefault(definition, len(definition_index)))
+        hyponyms.append(synset.hyponyms())
+    return sid
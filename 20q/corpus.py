@@ -0,0 +1,37 @@
+"""
+Deferred access to the NLTK WordNet corpus.
+
+Importing NLTK and loading WordNet takes a while, and downloading it takes longer,
+so none of that happens until something actually needs a synset.
+"""
+
+import threading
+
+_wordnet = None
+_lock = threading.Lock()
+
+
+def wordnet():
+    """
+    The WordNet corpus reader, downloading the corpus and loading it on first use.
+    Safe to call from several threads at once; only the first call does any work.
+    """
+    global _wordnet
+    if _wordnet is None:
+        with _lock:
+            if _wordnet is None:
+                import nltk
+                from nltk.corpus import wordnet as wn
+                # download WordNet
+                try:
+                    nltk.data.find('corpora/wordnet.zip')
+                except LookupError:
+                    nltk.download('wordnet')
+                wn.ensure_loaded()
+                _wordnet = wn
+    return _wordnet
+
+
+def synset(label: str):
+    """The Synset with the given label, e.g. `entity.n.01`."""
+    return wordnet().synset(label)
@@ -0,0 +1,185 @@
+"""
+A lazily-expanded version of the 20 Questions hyponym tree.
+
+A game only visits a few dozen synsets, so instead of building the whole tree
+up front, `LazyNode` asks WordNet for a synset's hyponyms the first time the game
+descends into it. Children are ordered by subtree size, which comes from a
+count table computed once for the whole noun hierarchy and cached on disk
+(see `load_counts`), rather than from expanding the subtree.
+"""
+
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+from . import snapshot
+
+MAGIC = b'NLPG20QC'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sIII')
+
+
+class CountTable:
+    """
+    Subtree sizes of every noun synset, keyed by synset offset.
+    `offsets` is sorted, and `counts[i]` is the size of the tree under `offsets[i]`.
+    """
+    def __init__(self, offsets: array, counts: array):
+        self.offsets = offsets
+        self.counts = counts
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def get(self, offset: int, default: int = None) -> int:
+        i = bisect_left(self.offsets, offset)
+        if i < len(self.offsets) and self.offsets[i] == offset:
+            return self.counts[i]
+        return default
+
+
+class LazyNode:
+    """A synset whose hyponyms are only looked up on first use. Mirrors the `Node` interface."""
+    __slots__ = ('synset', 'counts', '_children', '_prefix')
+
+    def __init__(self, synset, counts: CountTable):
+        self.synset = synset
+        self.counts = counts
+        self._children = None
+        self._prefix = None
+
+    def __repr__(self):
+        return f'LazyNode({self.label!r})'
+
+    @property
+    def label(self) -> str:
+        return self.synset.name()
+
+    @property
+    def definition(self) -> str:
+        return self.synset.definition()
+
+    @property
+    def children(self) -> list:
+        """The hyponyms of this node, largest subtree first."""
+        if self._children is None:
+            children = [LazyNode(h, self.counts) for h in self.synset.hyponyms()]
+            children.sort(key=LazyNode.count, reverse=True)
+            self._children = children
+        return self._children
+
+    def num_children(self) -> int:
+        return len(self.children)
+
+    def child(self, i: int) -> 'LazyNode':
+        """The `i`th child, counting from the largest."""
+        return self.children[i]
+
+    def prefix_size(self, i: int) -> int:
+        """The combined size of the first `i` children."""
+        if self._prefix is None:
+            self._prefix = list(accumulate((c.count() for c in self.children), initial=0))
+        return self._prefix[i]
+
+    def name(self) -> str:
+        """The nicely-formatted name of this synset."""
+        return self.label.rsplit('.')[0].replace('_', ' ')
+
+    def defn(self) -> str:
+        """The definition of this synset."""
+        return self.definition
+
+    def count(self) -> int:
+        """
+        The number of nodes in this tree.
+        Returns 1 if this is a leaf (no known hyponyms).
+        """
+        count = self.counts.get(self.synset.offset())
+        if count is None:
+            # Not in the table (e.g. it was built from other data): count it the slow way.
+            count = _count(self.synset, {})
+        return count
+
+
+def count_synsets(synsets) -> CountTable:
+    """
+    Count the subtree under each of `synsets`, as `Node.count` would for a tree built from it.
+    Each synset's hyponyms are only visited once.
+    """
+    memo = {}
+    for synset in synsets:
+        _count(synset, memo)
+    offsets = array('I', sorted(memo))
+    return CountTable(offsets, array('I', (memo[o] for o in offsets)))
+
+
+def _count(synset, memo: dict) -> int:
+    offset = synset.offset()
+    count = memo.get(offset)
+    if count is None:
+        count = memo[offset] = 1 + sum(_count(h, memo) for h in synset.hyponyms())
+    return count
+
+
+def counts_path() -> str:
+    return os.path.join(snapshot.cache_dir(), '20q-counts.bin')
+
+
+def save_counts(table: CountTable, path: str, fingerprint: str) -> None:
+    import tempfile
+
+    fp = fingerprint.encode('utf-8')
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(fp), len(table)))
+            f.write(fp)
+            table.offsets.tofile(f)
+            table.counts.tofile(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_counts_file(path: str, fingerprint: str = None) -> CountTable:
+    """The count table at `path`, or `None` if it is missing or stale."""
+    try:
+        with open(path, 'rb') as f:
+            magic, version, fp_length, n = _HEADER.unpack(f.read(_HEADER.size))
+            saved_fingerprint = f.read(fp_length).decode('utf-8')
+            if magic != MAGIC or version != FORMAT_VERSION:
+                return None
+            if fingerprint is not None and saved_fingerprint != fingerprint:
+                return None
+            offsets, counts = array('I'), array('I')
+            offsets.fromfile(f, n)
+            counts.fromfile(f, n)
+    except (OSError, EOFError, struct.error, UnicodeDecodeError):
+        return None
+    return CountTable(offsets, counts)
+
+
+def load_counts(wordnet) -> CountTable:
+    """
+    The count table for the installed WordNet nouns, computed and cached on first use.
+
+    Params:
+        wordnet: The WordNet corpus reader, only walked when the cache is missing or stale.
+    """
+    path = counts_path()
+    fingerprint = snapshot.wordnet_fingerprint()
+    table = load_counts_file(path, fingerprint)
+    if table is None:
+        table = count_synsets(wordnet.all_synsets('n'))
+        try:
+            save_counts(table, path, fingerprint)
+        except OSError as e:
+            print(f'Could not save the count table to {path}: {e}', file=sys.stderr)
+    return table
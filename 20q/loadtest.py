@@ -0,0 +1,91 @@
+"""
+Load test for `server.py`.
+
+Plays many simulated games at once. Each simulated player picks a random synset
+from the same tree as the server and answers every question truthfully.
+
+Usage:
+`python -m 20q.loadtest [--games <n>] [--concurrency <n>] [--port <port> | --unix <path>] [<category>]`
+
+Reports sessions (games) per second, and the median and 99th percentile latency of a turn
+(from sending an answer to receiving the next message).
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from .server import add_tree_arguments, load
+
+
+async def play_one(tree, target: int, args, latencies: list) -> bool:
+    """Play one game for the word at node `target`. Returns whether the server guessed it."""
+    path = set(tree.path(target))
+    word = tree.label(target)
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        sent = None
+        while True:
+            line = await reader.readline()
+            if sent is not None:
+                latencies.append(time.perf_counter() - sent)
+            fields = line.decode('utf-8').split()
+            if not fields or fields[0] in ('win', 'lose', 'error'):
+                return len(fields) == 3 and fields[0] == 'win' and fields[2] == word
+            labels = fields[2:]
+            if labels == [word]:
+                answer = b'y!\n'
+            elif path.intersection(labels):
+                answer = b'y\n'
+            else:
+                answer = b'n\n'
+            writer.write(answer)
+            sent = time.perf_counter()
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def run(tree, args) -> None:
+    rng = random.Random(args.seed)
+    targets = [rng.randrange(len(tree)) for _ in range(args.games)]
+    latencies = []
+    results = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def worker(target):
+        async with semaphore:
+            try:
+                results.append(await play_one(tree, target, args, latencies))
+            except OSError:
+                results.append(None)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(t) for t in targets))
+    elapsed = time.perf_counter() - start
+
+    won = results.count(True)
+    failed = results.count(None)
+    latencies.sort()
+    print(f'{args.games} games ({args.concurrency} concurrent) in {elapsed:.2f}s: '
+          f'{args.games / elapsed:.1f} sessions/s, {len(latencies) / elapsed:.1f} turns/s')
+    print(f'{won} guessed, {args.games - won - failed} not guessed, {failed} connection errors')
+    if latencies:
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f'turn latency: median {statistics.median(latencies) * 1000:.3f}ms, p99 {p99 * 1000:.3f}ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test a Twenty Questions server.')
+    add_tree_arguments(parser)
+    parser.add_argument('-n', '--games', type=int, default=10000)
+    parser.add_argument('-c', '--concurrency', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run(load(args), args))
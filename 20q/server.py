@@ -0,0 +1,161 @@
+"""
+A Twenty Questions server for many players at once.
+
+The tree is loaded once (from its snapshot) and shared read-only by every session;
+a session only holds a `Game`, i.e. a node and a handful of integers.
+
+Usage:
+`python -m 20q.server [--port <port> | --unix <path>] [--strategy halving] [<category>]`
+
+Protocol (one UTF-8 line per message):
+
+    server: ask <question number> <label> [<label> ...]
+        Is the word under one of these synsets?
+    client: y | n | y! | ? | ? <word>
+        `y!` means the (single) synset asked about is exactly the word.
+        `?` asks for definitions.
+        `? <word>` looks up a word (e.g. `domestic cat`) or the words starting with it.
+    server: def <label> <definition>
+        One per synset in the question, followed by the question again.
+    server: sense <label> <definition>
+        One per sense of the word looked up, followed by the question again.
+    server: match <word>
+        If the word looked up is not a word, one per word starting with it (at most 10),
+        followed by the question again.
+    server: win <questions asked> <label>
+    server: lose <questions asked>
+    server: error <message>
+
+The server asks the first question as soon as a client connects,
+and closes the connection when the game ends.
+"""
+
+import argparse
+import asyncio
+import time
+
+import metrics
+from . import snapshot
+from .strategies import STRATEGIES, Game
+
+POS = ('yes', 'y')
+NEG = ('no', 'n')
+
+
+class GameServer:
+    """Serves games over one shared, read-only tree."""
+    def __init__(self, tree, strategy=STRATEGIES['sibling']):
+        self.tree = tree
+        self.strategy = strategy
+
+    def look_up(self, writer: asyncio.StreamWriter, term: str) -> None:
+        """Write the senses of `term`, or the words starting with it."""
+        senses = self.tree.resolve(term)
+        for v in senses:
+            writer.write(f'sense {self.tree.label(v)} {self.tree.definition(v)}\n'.encode())
+        if not senses:
+            for word in self.tree.complete(term):
+                writer.write(f'match {word}\n'.encode())
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        game = Game(self.tree.root, self.strategy)
+        answered = None
+        try:
+            while True:
+                group = game.question()
+                if answered is not None:
+                    metrics.observe('twentyq_turn_seconds', time.perf_counter() - answered, mode='server')
+                if group is None:
+                    word = game.answer_node()
+                    if word is None:
+                        writer.write(f'lose {game.q_num}\n'.encode())
+                    else:
+                        writer.write(f'win {game.q_num} {word.label}\n'.encode())
+                    break
+
+                labels = ' '.join(node.label for node in group)
+                writer.write(f'ask {game.q_num + 1} {labels}\n'.encode())
+                await writer.drain()
+
+                line = await reader.readline()
+                if not line:
+                    break
+                answered = time.perf_counter()
+                response = line.decode('utf-8', 'replace').strip().lower()
+
+                if response.endswith('!') and len(group) == 1:
+                    writer.write(f'win {game.q_num + 1} {group[0].label}\n'.encode())
+                    break
+                if response.rstrip('!') in POS:
+                    game.answer(True)
+                elif response in NEG:
+                    game.answer(False)
+                elif response == '?':
+                    for node in group:
+                        writer.write(f'def {node.label} {node.definition}\n'.encode())
+                elif response.startswith('?'):
+                    self.look_up(writer, response[1:].strip())
+                else:
+                    writer.write(f'error unknown response {response!r}\n'.encode())
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(tree, strategy=STRATEGIES['sibling'], host='127.0.0.1', port=2020, unix=None,
+                metrics_path=None) -> None:
+    """
+    Serve games over `tree` until cancelled, on TCP `host:port` or on the Unix socket `unix`.
+    With `metrics_path`, the metrics are written there on SIGUSR1.
+    """
+    if metrics_path:
+        metrics.dump_on_signal(asyncio.get_running_loop(), metrics_path)
+    server = GameServer(tree, strategy)
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle, path=unix, backlog=4096)
+    else:
+        listener = await asyncio.start_server(server.handle, host=host, port=port, backlog=4096)
+    where = unix or f'{host}:{port}'
+    print(f'Serving {len(tree)} nodes on {where}')
+    async with listener:
+        await listener.serve_forever()
+
+
+def load(args):
+    """The tree named by the command-line arguments shared with `loadtest.py`."""
+    if args.snapshot:
+        tree = snapshot.load(args.snapshot)
+        if tree is None:
+            raise SystemExit(f'{args.snapshot} is not a valid snapshot.')
+        return tree
+    return snapshot.load_or_build(args.category, dag=args.dag)
+
+
+def add_tree_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('category', nargs='?', default='entity.n.01', help='the starting synset')
+    parser.add_argument('-d', '--dag', action='store_true',
+                        help='store synsets with several hypernyms once instead of copying them')
+    parser.add_argument('--snapshot', metavar='FILE', help='serve this snapshot file instead of the cached tree')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2020)
+    parser.add_argument('--unix', metavar='PATH', help='use a Unix socket instead of TCP')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve Twenty Questions games.')
+    add_tree_arguments(parser)
+    parser.add_argument('-s', '--strategy', choices=sorted(STRATEGIES), default='sibling',
+                        help='how to pick questions')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='record timings, write them to FILE at exit and on SIGUSR1 '
+                             '(- for stderr; .prom for Prometheus text)')
+    args = parser.parse_args()
+    if args.metrics:
+        metrics.enable(args.metrics)
+
+    try:
+        asyncio.run(serve(load(args), STRATEGIES[args.strategy], args.host, args.port, args.unix, args.metrics))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,250 @@
+"""
+On-disk snapshots of a `CompactTree`.
+
+Building the tree means loading the WordNet corpus and walking every hyponym,
+which takes seconds. A snapshot stores the tree's arrays as-is, so loading one
+is a single `mmap`: every array in the returned tree is a `memoryview` into the
+file, and nothing is deserialized per node.
+
+File layout (header integers are little-endian; the arrays use the byte order of
+the machine that wrote them):
+
+    magic           8 bytes, `MAGIC`
+    version         uint32, `FORMAT_VERSION`
+    byteorder       uint32, 1 if the arrays are little-endian
+    fingerprint     uint32 length + UTF-8 string, identifies the WordNet data
+    sections        uint32 count, then (32-byte name, uint64 offset, uint64 size) each
+    data            the raw bytes of each section, 8-byte aligned
+
+A snapshot whose version, byte order or fingerprint does not match is ignored,
+and `load_or_build` rebuilds it.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+
+import metrics
+from .compact import CompactTree, LemmaIndex, StringTable, build_compact_tree
+
+MAGIC = b'NLPG20Q\0'
+FORMAT_VERSION = 5
+
+# (name, typecode) of every section, in file order.
+SECTIONS = (
+    ('child_offsets', 'I'),
+    ('children', 'I'),
+    ('synsets', 'I'),
+    ('sizes', 'I'),
+    ('size_prefix', 'Q'),
+    ('path_counts', 'I'),
+    ('parents', 'I'),
+    ('label_index', 'I'),
+    ('definition_ids', 'I'),
+    ('label_offsets', 'I'),
+    ('label_blob', 'B'),
+    ('definition_offsets', 'I'),
+    ('definition_blob', 'B'),
+    ('lemma_offsets', 'I'),
+    ('lemma_blob', 'B'),
+    ('sense_offsets', 'I'),
+    ('senses', 'I'),
+)
+
+_HEADER = struct.Struct('<8sII')
+_LENGTH = struct.Struct('<I')
+_SECTION = struct.Struct('<32sQQ')
+_ALIGN = 8
+
+
+def cache_dir() -> str:
+    """Where snapshots are kept: `$NLPGAMES_CACHE`, or `~/.cache/nlpgames`."""
+    return os.environ.get('NLPGAMES_CACHE') or os.path.join(os.path.expanduser('~'), '.cache', 'nlpgames')
+
+
+def snapshot_path(root_label: str, dag: bool = False) -> str:
+    """The snapshot file for the tree (or DAG) under `root_label`."""
+    return os.path.join(cache_dir(), f'20q-{root_label}.{"dag" if dag else "tree"}')
+
+
+def wordnet_source() -> str:
+    """The file holding the installed WordNet noun data (or the zip file containing it)."""
+    import nltk.data
+
+    pointer = nltk.data.find('corpora/wordnet/data.noun')
+    zipfile = getattr(pointer, 'zipfile', None)
+    return zipfile.filename if zipfile is not None else pointer.path
+
+
+def wordnet_fingerprint(source: str = None) -> str:
+    """
+    A string that changes whenever the installed WordNet data changes.
+    Only stats the noun data file, so the corpus itself is not loaded.
+
+    Params:
+        source: The WordNet data file; found through NLTK if not given.
+    """
+    source = source or wordnet_source()
+    stat = os.stat(source)
+    return f'{source}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def is_current(fingerprint: str) -> bool:
+    """
+    Whether the WordNet data a snapshot was built from is unchanged.
+    Re-checks the file named in the fingerprint, without importing NLTK.
+    """
+    source = fingerprint.rsplit(':', 2)[0]
+    try:
+        return wordnet_fingerprint(source) == fingerprint
+    except OSError:
+        return False
+
+
+def _sections(tree: CompactTree) -> dict:
+    return {
+        'child_offsets': tree.child_offsets,
+        'children': tree.children,
+        'synsets': tree.synsets,
+        'sizes': tree.sizes,
+        'size_prefix': tree.size_prefix,
+        'path_counts': tree.path_counts,
+        'parents': tree.parents,
+        'label_index': tree.label_index,
+        'definition_ids': tree.definition_ids,
+        'label_offsets': tree.labels.offsets,
+        'label_blob': tree.labels.blob,
+        'definition_offsets': tree.definitions.offsets,
+        'definition_blob': tree.definitions.blob,
+        'lemma_offsets': tree.lemmas.lemmas.offsets,
+        'lemma_blob': tree.lemmas.lemmas.blob,
+        'sense_offsets': tree.lemmas.sense_offsets,
+        'senses': tree.lemmas.senses,
+    }
+
+
+def save(tree: CompactTree, path: str, fingerprint: str) -> None:
+    """
+    Write `tree` to `path`.
+    The file is written next to `path` and renamed into place, so readers never see a partial snapshot.
+    """
+    data = [memoryview(a).cast('B') for a in map(_sections(tree).get, (name for name, _ in SECTIONS))]
+    fp = fingerprint.encode('utf-8')
+
+    header = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == 'little'))
+    header += _LENGTH.pack(len(fp)) + fp
+    header += _LENGTH.pack(len(SECTIONS))
+    offset = _aligned(len(header) + _SECTION.size * len(SECTIONS))
+    for (name, _), section in zip(SECTIONS, data):
+        header += _SECTION.pack(name.encode('ascii'), offset, section.nbytes)
+        offset = _aligned(offset + section.nbytes)
+
+    import tempfile
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            for section in data:
+                f.write(b'\0' * (_aligned(f.tell()) - f.tell()))
+                f.write(section)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load(path: str, fingerprint: str = None) -> CompactTree:
+    """
+    Map the snapshot at `path` into memory.
+
+    Params:
+        path: The snapshot file.
+        fingerprint: If given, the snapshot must have been saved with this fingerprint.
+    Returns:
+        The tree, or `None` if the file is missing, stale, or from another format version.
+    """
+    try:
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(buf)
+    try:
+        magic, version, little = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION or little != (sys.byteorder == 'little'):
+            return None
+        pos = _HEADER.size
+        (length,) = _LENGTH.unpack_from(view, pos)
+        pos += _LENGTH.size
+        saved_fingerprint = str(view[pos:pos + length], 'utf-8')
+        if fingerprint is not None and saved_fingerprint != fingerprint:
+            return None
+        pos += length
+        (count,) = _LENGTH.unpack_from(view, pos)
+        pos += _LENGTH.size
+
+        sections = {}
+        for _ in range(count):
+            name, offset, size = _SECTION.unpack_from(view, pos)
+            pos += _SECTION.size
+            sections[name.rstrip(b'\0').decode('ascii')] = view[offset:offset + size]
+        for name, typecode in SECTIONS:
+            sections[name] = sections[name].cast(typecode)
+    except (struct.error, KeyError, TypeError, ValueError, UnicodeDecodeError):
+        return None
+
+    tree = CompactTree(
+        sections['child_offsets'], sections['children'], sections['synsets'], sections['sizes'],
+        sections['size_prefix'], sections['path_counts'], sections['parents'], sections['label_index'],
+        StringTable(sections['label_offsets'], sections['label_blob']),
+        StringTable(sections['definition_offsets'], sections['definition_blob']),
+        sections['definition_ids'],
+        LemmaIndex(StringTable(sections['lemma_offsets'], sections['lemma_blob']),
+                   sections['sense_offsets'], sections['senses']),
+    )
+    # The arrays are views into the mapping; keep it alive with the tree.
+    tree.mapping = buf
+    tree.fingerprint = saved_fingerprint
+    return tree
+
+
+def load_or_build(root_label: str, synset=None, dag: bool = False) -> CompactTree:
+    """
+    Load the snapshot of the tree under `root_label`, building and saving it first
+    if it is missing or the WordNet data has changed since it was written.
+    Neither NLTK nor WordNet is loaded unless the snapshot has to be rebuilt.
+
+    Params:
+        root_label: The label of the root synset, e.g. `entity.n.01`.
+        synset: A function from a label to a Synset, used only when rebuilding.
+        dag: Load the DAG version, where shared synsets are stored once.
+    """
+    start = time.perf_counter()
+    path = snapshot_path(root_label, dag)
+    tree = load(path)
+    if tree is not None and is_current(tree.fingerprint):
+        metrics.observe('tree_load_seconds', time.perf_counter() - start, source='snapshot')
+        return tree
+
+    if synset is None:
+        from .corpus import synset
+    # Look the root up first: that downloads WordNet if it is missing.
+    root = synset(root_label)
+    fingerprint = wordnet_fingerprint()
+    tree = build_compact_tree(root, dag=dag)
+    try:
+        save(tree, path, fingerprint)
+    except OSError as e:
+        print(f'Could not save the tree snapshot to {path}: {e}', file=sys.stderr)
+    metrics.observe('tree_load_seconds', time.perf_counter() - start, source='build')
+    return tree
+
+
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
@@ -0,0 +1,114 @@
+"""
+Question-picking strategies for 20 Questions.
+
+A game is always at some node of the tree, with a run `[lo, hi)` of that node's
+children (largest subtree first) still in play. Each question asks whether the
+secret word is under one of the children `[lo, mid)`; a strategy only decides
+where `mid` goes:
+
+- `SiblingStrategy` asks about one child at a time, largest first.
+- `HalvingStrategy` groups siblings so that each question splits the remaining
+  nodes as close to half as it can.
+
+Nodes must provide `num_children`, `child` and `prefix_size`
+(see `CompactNode` and `LazyNode`), so each question costs O(log k) for a node with k children.
+"""
+
+
+class SiblingStrategy:
+    """Ask about the largest remaining child, one at a time."""
+    name = 'sibling'
+    # When every child has been ruled out, the player should have answered `yes!` earlier.
+    exhausted_is_node = False
+
+    def split(self, node, lo: int, hi: int) -> int:
+        return lo + 1
+
+
+class HalvingStrategy:
+    """Ask about a group of siblings holding as close to half of the remaining nodes as possible."""
+    name = 'halving'
+    # Every child was ruled out after descending here, so the word must be this node.
+    exhausted_is_node = True
+
+    def split(self, node, lo: int, hi: int) -> int:
+        if hi - lo == 1:
+            return hi
+        base = node.prefix_size(lo)
+        half = (node.prefix_size(hi) - base) / 2
+
+        # Binary search for the first `mid` whose group holds at least half.
+        a, b = lo + 1, hi - 1
+        while a < b:
+            m = (a + b) // 2
+            if node.prefix_size(m) - base >= half:
+                b = m
+            else:
+                a = m + 1
+        # The group just short of half may be closer.
+        if a > lo + 1 and half - (node.prefix_size(a - 1) - base) < node.prefix_size(a) - base - half:
+            a -= 1
+        return a
+
+
+STRATEGIES = {s.name: s for s in (SiblingStrategy(), HalvingStrategy())}
+
+
+class Game:
+    """
+    The state of one game: the current node, the children still in play,
+    the split point of the current question, and the question number.
+    """
+    __slots__ = ('root', 'strategy', 'node', 'lo', 'hi', 'mid', 'q_num')
+
+    def __init__(self, root, strategy=STRATEGIES['sibling']):
+        self.root = root
+        self.strategy = strategy
+        self.q_num = 0
+        self._enter(root)
+
+    def _enter(self, node) -> None:
+        self.node = node
+        self.lo = 0
+        self.hi = node.num_children()
+        self.mid = None
+
+    def question(self) -> list:
+        """
+        The group of nodes to ask about next, or `None` if there is nothing left to ask
+        (see `answer_node`).
+        """
+        if self.lo >= self.hi:
+            return None
+        if self.mid is None:
+            self.mid = self.strategy.split(self.node, self.lo, self.hi)
+        return [self.node.child(i) for i in range(self.lo, self.mid)]
+
+    def answer(self, yes: bool) -> None:
+        """Update the state with the answer to the current question."""
+        if self.mid is None:
+            self.question()
+        self.q_num += 1
+        if yes:
+            if self.mid - self.lo == 1:
+                self._enter(self.node.child(self.lo))
+                return
+            self.hi = self.mid
+            if self.hi - self.lo == 1:
+                # Narrowed down to one subtree: move into it without spending a question.
+                self._enter(self.node.child(self.lo))
+                return
+        else:
+            self.lo = self.mid
+        self.mid = None
+
+    def answer_node(self):
+        """
+        Once `question` returns `None`: the node that must be the word, or `None`
+        if the game is lost.
+        """
+        if self.node.num_children() == 0:
+            return self.node
+        if self.strategy.exhausted_is_node and self.node is not self.root:
+            return self.node
+        return None
@@ -0,0 +1,149 @@
+"""
+Runs the benchmark suites and saves their results together, to compare between commits.
+
+Suites:
+
+    connections  `python -m connections.bench_connections`: games against a local ConceptNet stand-in
+    wordnet      `python -m 20q.bench_wordnet`: building and searching the tree on fixed WordNet roots
+
+Each suite runs in its own process. The results, with the commit they were measured at,
+go to `bench-results/<commit>.json` (or `-o <file>`).
+
+The suites time their work with `timed`, so every result has the same fields.
+
+Usage:
+`python bench.py [--suite connections|wordnet ...] [-o <file>] [--compare <earlier results>]`
+`python bench.py --suite connections -- --latency 50 --error-rate 0.05` passes options on to one suite.
+
+`--compare` prints how each median changed since the earlier results,
+marking slowdowns beyond `--threshold` (10% by default).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# The module each suite runs, with `python -m` from the repository root.
+SUITES = {
+    'connections': 'connections.bench_connections',
+    'wordnet': '20q.bench_wordnet',
+}
+
+
+def summary(times: list) -> dict:
+    """Seconds per run: mean, median, min and max."""
+    return {
+        'runs': len(times),
+        'mean': statistics.mean(times),
+        'median': statistics.median(times),
+        'min': min(times),
+        'max': max(times),
+    }
+
+
+def timed(work, runs: int, before=None) -> dict:
+    """Time `work()` `runs` times, calling `before(run)` (untimed) ahead of each run if given."""
+    times = []
+    for run in range(runs):
+        if before is not None:
+            before(run)
+        start = time.perf_counter()
+        work()
+        times.append(time.perf_counter() - start)
+    return summary(times)
+
+
+def commit() -> str:
+    """The current commit, with `-dirty` if there are uncommitted changes; `unknown` outside git."""
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             check=True, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return sha + ('-dirty' if dirty else '')
+
+
+def run_suite(name: str, extra: list) -> dict:
+    """Run one suite in a fresh process and return its report."""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'results.json')
+        subprocess.run([sys.executable, '-m', SUITES[name], '--json', out, *extra], cwd=ROOT, check=True)
+        with open(out, encoding='utf-8') as f:
+            return json.load(f)
+
+
+def medians(results: dict, prefix: str = '') -> dict:
+    """Every measurement's median, by its path, e.g. `wordnet/dog.n.01/build_tree`."""
+    found = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            if 'median' in value:
+                found[prefix + key] = value['median']
+            else:
+                found.update(medians(value, f'{prefix}{key}/'))
+    return found
+
+
+def compare(before: dict, after: dict, threshold: float) -> int:
+    """Print each median's change from `before` to `after`; returns how many got slower than `threshold`."""
+    old = medians({name: suite['results'] for name, suite in before['suites'].items()})
+    new = medians({name: suite['results'] for name, suite in after['suites'].items()})
+    print(f'\n{before["commit"]} -> {after["commit"]}')
+    print(f'{"measurement":<48}{"before (ms)":>12}{"after (ms)":>12}{"change":>9}')
+    slower = 0
+    for key in sorted(old.keys() & new.keys()):
+        change = new[key] / old[key] - 1 if old[key] else 0
+        flag = ''
+        if change > threshold:
+            flag = '  slower'
+            slower += 1
+        print(f'{key:<48}{old[key] * 1000:>12.2f}{new[key] * 1000:>12.2f}{change:>+9.1%}{flag}')
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the benchmark suites and save the results.')
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES), help='only run these (default: all)')
+    parser.add_argument('-o', '--out', help='where to save the results (default: bench-results/<commit>.json)')
+    parser.add_argument('--compare', metavar='FILE', help='earlier results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='the slowdown to report, as a fraction')
+    parser.add_argument('extra', nargs=argparse.REMAINDER, help='options for the suite, after --')
+    args = parser.parse_args()
+    extra = args.extra[1:] if args.extra[:1] == ['--'] else args.extra
+    suites = args.suite or list(SUITES)
+    if extra and len(suites) > 1:
+        parser.error('suite options need a single --suite')
+
+    report = {
+        'commit': commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'suites': {},
+    }
+    for name in suites:
+        print(f'== {name}')
+        try:
+            report['suites'][name] = run_suite(name, extra)
+        except subprocess.CalledProcessError:
+            print(f'The {name} suite failed; leaving it out.', file=sys.stderr)
+
+    out = args.out or os.path.join(ROOT, 'bench-results', f'{report["commit"]}.json')
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print(f'Saved results to {out}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            if compare(json.load(f), report, args.threshold):
+                sys.exit(1)
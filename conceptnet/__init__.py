@@ -0,0 +1,3 @@
+"""
+Shared access to ConceptNet for the games that use it (Connections and Relationle).
+"""
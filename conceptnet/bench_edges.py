@@ -0,0 +1,185 @@
+"""
+Benchmark for `conceptnet.edges`: decoding whole responses vs. compact records.
+
+Each page is made up in the API's full format (with `@context`, `sources`, `dataset`,
+`license`, `surfaceText`, `sense_label`...), all edges ending at the same term, as
+a `/query?end=...&rel=...` page does. Two ways of reading the labels are compared:
+
+- full:     `json.loads`, then read the labels out of the dicts (what `res.json()` costs)
+- compact:  `decode_page`, then read the labels out of the records
+
+For each page size it reports the parse time, the peak memory allocated while
+parsing, and the memory the result keeps alive. With a `QueryCache` (as the games
+use by default) it also times a miss (parse, then store what `get` or `page` stores)
+and a hit (load, plus turning the trimmed response back into records).
+
+Before timing, it checks that `decode_page`, `compact_page` and the cache round trip
+read every page the same way, including a page with an `ExternalURL` edge and a `/c/` page.
+
+Usage:
+`python -m conceptnet.bench_edges [--sizes 20 100 1000] [--repeat <n>]`
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from conceptnet.cache import QueryCache
+from conceptnet.edges import compact_page, decode_page, page_response
+
+URL = '/query?end=/c/en/dog&rel=/r/IsA'
+
+
+def _node(term: str) -> dict:
+    return {
+        '@id': f'/c/en/{term}/n/wn/animal',
+        '@type': 'Node',
+        'label': term.replace('_', ' '),
+        'language': 'en',
+        'sense_label': 'n, animal',
+        'term': f'/c/en/{term}',
+    }
+
+
+def synthetic_page(size: int) -> bytes:
+    """A full-format API response with `size` IsA edges ending at `dog`."""
+    edges = []
+    for i in range(size):
+        start = f'dog_breed_{i}'
+        edges.append({
+            '@id': f'/a/[/r/IsA/,/c/en/{start}/n/,/c/en/dog/n/]',
+            '@type': 'Edge',
+            'dataset': '/d/wordnet/3.1',
+            'end': _node('dog'),
+            'license': 'cc:by/4.0',
+            'rel': {'@id': '/r/IsA', '@type': 'Relation', 'label': 'IsA'},
+            'sources': [
+                {'@id': '/s/resource/wordnet/rdf/3.1', '@type': 'Source',
+                 'contributor': '/s/resource/wordnet/rdf/3.1'},
+                {'@id': '/and/[/s/process/split_words/,/s/resource/verbosity/]', '@type': 'Source',
+                 'activity': '/s/process/split_words', 'contributor': '/s/resource/verbosity'},
+            ],
+            'start': _node(start),
+            'surfaceText': f'[[{start}]] is a type of [[dog]]',
+            'weight': 2.0,
+        })
+    query = '/query?end=/c/en/dog&rel=/r/IsA'
+    return json.dumps({
+        '@context': ['http://api.conceptnet.io/ld/conceptnet5.7/context.ld.json'],
+        '@id': query,
+        'edges': edges,
+        'view': {
+            '@id': f'{query}&offset=0&limit={size}',
+            '@type': 'PartialCollectionView',
+            'comment': 'There are more results. Follow the \'nextPage\' link for more.',
+            'firstPage': f'{query}&offset=0&limit={size}',
+            'nextPage': f'{query}&offset={size}&limit={size}',
+            'paginatedProperty': 'edges',
+        },
+    }).encode('utf-8')
+
+
+# Not every edge ends at a term: e.g. `/r/ExternalURL` edges, returned by queries without `rel`.
+EXTERNAL_EDGE = {
+    '@id': '/a/[/r/ExternalURL/,/c/en/dog/n/,http://dbpedia.org/resource/Dog/]',
+    '@type': 'Edge',
+    'dataset': '/d/dbpedia/en',
+    'end': {'@id': 'http://dbpedia.org/resource/Dog', '@type': 'Node', 'label': 'Dog', 'site': 'dbpedia.org'},
+    'license': 'cc:by-sa/4.0',
+    'rel': {'@id': '/r/ExternalURL', '@type': 'Relation', 'label': 'ExternalURL'},
+    'sources': [{'@id': '/s/resource/dbpedia/2015/en', '@type': 'Source',
+                 'contributor': '/s/resource/dbpedia/2015/en'}],
+    'start': _node('dog'),
+    'surfaceText': None,
+    'weight': 1.0,
+}
+
+
+def term_page(size: int) -> bytes:
+    """A `/c/en/dog` response: the response has the same `@id` as the `dog` node its edges end at."""
+    response = json.loads(synthetic_page(size))
+    for edge in response['edges']:
+        edge['end'] = {'@id': '/c/en/dog', 'label': 'dog', 'language': 'en', 'term': '/c/en/dog'}
+    response['@id'] = '/c/en/dog'
+    response['view'] = {'@id': f'/c/en/dog?offset=0&limit={size}', '@type': 'PartialCollectionView',
+                        'nextPage': f'/c/en/dog?offset={size}&limit={size}'}
+    return json.dumps(response).encode('utf-8')
+
+
+def check(raw: bytes) -> None:
+    """`decode_page`, `compact_page` and a round trip through the cache all read `raw` the same way."""
+    page = decode_page(raw)
+    assert page == compact_page(json.loads(raw)), 'decode_page and compact_page disagree'
+    assert page == compact_page(page_response(page)), 'a cached page reads differently'
+
+
+def full(raw: bytes):
+    response = json.loads(raw)
+    return response, [edge['start']['label'] for edge in response['edges'] if edge['start']['language'] == 'en']
+
+
+def compact(raw: bytes):
+    page = decode_page(raw)
+    return page, [edge.start.label for edge in page.edges if edge.start.language == 'en']
+
+
+def fastest(work, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        work()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure(parse, store, load, raw: bytes, repeat: int) -> dict:
+    """
+    The fastest parse, cache miss and cache hit in seconds, and the peak and retained bytes
+    allocated by a parse. `store` turns a parse's result into what is cached; `load` turns it back.
+    """
+    cache = QueryCache(':memory:')
+    result = parse(raw)[0]
+    cache.put(URL, store(result))
+    seconds = fastest(lambda: parse(raw), repeat)
+    miss = fastest(lambda: cache.put(URL, store(parse(raw)[0])), repeat)
+    hit = fastest(lambda: load(cache.get(URL)), repeat)
+    del result
+
+    tracemalloc.start()
+    # Hold on to the result until memory is measured, so what it keeps alive is counted as retained.
+    result = parse(raw)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {'seconds': seconds, 'miss': miss, 'hit': hit, 'peak': peak, 'retained': retained}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark decoding ConceptNet responses into compact records.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000], help='edges per page')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    # (key, heading, scale, decimals)
+    columns = (('seconds', 'parse (ms)', 1000, 3), ('miss', 'miss (ms)', 1000, 3), ('hit', 'hit (ms)', 1000, 3),
+               ('peak', 'peak (KB)', 1 / 1024, 0), ('retained', 'kept (KB)', 1 / 1024, 0))
+
+    def cells(values: dict) -> str:
+        return ''.join(f'{values[key] * scale:>11.{decimals}f}' for key, _, scale, decimals in columns)
+
+    print(f'{"edges":>6}{"KB":>8}  {"":<8}' + ''.join(f'{heading:>11}' for _, heading, _, _ in columns))
+    response = json.loads(synthetic_page(2))
+    response['edges'].append(EXTERNAL_EDGE)
+    check(json.dumps(response).encode('utf-8'))
+    check(term_page(2))
+
+    for size in args.sizes:
+        raw = synthetic_page(size)
+        check(raw)
+        assert full(raw)[1] == compact(raw)[1]
+        before = measure(full, lambda response: response, lambda response: response, raw, args.repeat)
+        after = measure(compact, page_response, compact_page, raw, args.repeat)
+        print(f'{size:>6}{len(raw) / 1024:>8.0f}  {"full":<8}{cells(before)}')
+        print(f'{"":>16}{"compact":<8}{cells(after)}')
+        print(f'{"":>16}{"saved":<8}{cells({key: before[key] - after[key] for key in before})}')
@@ -0,0 +1,144 @@
+"""
+A persistent on-disk cache of ConceptNet responses, backed by SQLite.
+
+Entries are keyed by the normalized query URL (see `normalize_url`), expire after
+`ttl` seconds, and the least recently used ones are evicted once there are more
+than `max_entries`. With `offline=True` the network is never used: a miss is
+just a miss.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DEFAULT_TTL = 30 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def default_path() -> str:
+    """`conceptnet.sqlite` in `$NLPGAMES_CACHE`, or in `~/.cache/nlpgames`."""
+    directory = os.environ.get('NLPGAMES_CACHE') or os.path.join(os.path.expanduser('~'), '.cache', 'nlpgames')
+    return os.path.join(directory, 'conceptnet.sqlite')
+
+
+def normalize_url(url: str) -> str:
+    """
+    The cache key for a ConceptNet URL: scheme and host dropped, path and parameters
+    lowercased, parameters sorted and empty ones removed.
+    So `http://api.conceptnet.io/query?rel=/r/IsA&start=/c/en/Dog&` and
+    `https://api.conceptnet.io/query?start=/c/en/dog&rel=/r/isa` share an entry.
+    A fragment is kept, to store another form of the same response (e.g. `#edges`).
+    """
+    parts = urlsplit(url)
+    params = sorted((k.lower(), v.lower()) for k, v in parse_qsl(parts.query) if v)
+    key = parts.path.lower().rstrip('/')
+    if params:
+        key += '?' + urlencode(params, safe='/')
+    if parts.fragment:
+        key += '#' + parts.fragment
+    return key
+
+
+class QueryCache:
+    """
+    A SQLite-backed cache from normalized ConceptNet URLs to their JSON responses.
+    Safe to share between threads.
+    """
+    def __init__(self, path: str = None, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, offline: bool = False):
+        self.path = path or default_path()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._count = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS responses '
+                       '(key TEXT PRIMARY KEY, value BLOB, created REAL, used REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS responses_used ON responses (used)')
+            self._count = db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            self._db = db
+        return self._db
+
+    def get(self, url: str):
+        """The cached response for `url`, or `None` if it is missing or expired."""
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            row = db.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            db.execute('UPDATE responses SET used = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, url: str, response) -> None:
+        """Store `response` (any JSON-serializable value) for `url`."""
+        key = normalize_url(url)
+        value = zlib.compress(json.dumps(response, separators=(',', ':')).encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            updated = db.execute('UPDATE responses SET value = ?, created = ?, used = ? WHERE key = ?',
+                                 (value, now, now, key)).rowcount
+            if not updated:
+                db.execute('INSERT INTO responses VALUES (?, ?, ?, ?)', (key, value, now, now))
+                self._count += 1
+                if self._count > self.max_entries:
+                    self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Evict the least recently used entries, down to 90% of `max_entries` so this does not run on every insert."""
+        deleted = db.execute('DELETE FROM responses WHERE key IN '
+                             '(SELECT key FROM responses ORDER BY used LIMIT ?)',
+                             (self._count - int(self.max_entries * 0.9),)).rowcount
+        self._count -= deleted
+
+    def expire(self) -> int:
+        """Delete every expired entry. Returns how many were deleted."""
+        with self._lock:
+            deleted = self._connect().execute('DELETE FROM responses WHERE created < ?',
+                                              (time.time() - self.ttl,)).rowcount
+            self._count -= deleted
+            return deleted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute('DELETE FROM responses')
+            self._count = 0
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._connect()
+            return self._count
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,212 @@
+"""
+A shared HTTP client for the ConceptNet API.
+
+All requests go through one pooled `requests.Session`, so connections are kept
+alive and reused, with a timeout on every request and automatic retries (with
+exponential backoff) on connection errors, rate limiting and server errors.
+
+`ConceptNetClient.edges` streams edges across result pages, following each
+response's `view.nextPage` link only when the caller asks for more.
+`ConceptNetClient.edge_records` does the same with compact records (see `conceptnet.edges`).
+"""
+
+import os
+import time
+from urllib.parse import urlencode, urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+from conceptnet.edges import Page, compact_page, decode_page, page_response
+from conceptnet.scheduler import INTERACTIVE
+
+# Set `CONCEPTNET_URL` to point every client at another server (e.g. a local mirror).
+DEFAULT_BASE_URL = 'http://api.conceptnet.io'
+# Appended to a URL for its cache entry as a compact page, kept apart from the full response.
+PAGE_KEY = '#edges'
+# (connect, read) timeouts, in seconds.
+DEFAULT_TIMEOUT = (3.05, 15)
+
+
+def default_base_url() -> str:
+    return os.environ.get('CONCEPTNET_URL', DEFAULT_BASE_URL).rstrip('/')
+
+
+class ConceptNetClient:
+    """
+    Fetches ConceptNet responses over a pooled, keep-alive session.
+
+    Params:
+        base_url: The API root; `$CONCEPTNET_URL` or `http://api.conceptnet.io` by default.
+        timeout: Seconds to wait, either one number or a (connect, read) pair.
+        retries: How many times to retry a failed request.
+        backoff: Base delay between retries; doubles after each one.
+        pool_size: How many connections to keep open to the server.
+        cache: An optional `QueryCache` consulted before the network.
+        scheduler: An optional `Scheduler` that paces requests to the API's rate limits
+            and merges identical ones; share one between clients to share the limits.
+        priority: This client's requests' priority with the scheduler (see `conceptnet.scheduler`).
+    """
+    def __init__(self, base_url: str = None, timeout=DEFAULT_TIMEOUT, retries: int = 3,
+                 backoff: float = 0.5, pool_size: int = 16, cache=None, scheduler=None,
+                 priority: int = INTERACTIVE):
+        self.base_url = (base_url or default_base_url()).rstrip('/')
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler
+        self.priority = priority
+        # How many responses have been asked for (cached or not).
+        self.lookups = 0
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET',),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url(self, path: str, params: dict = None) -> str:
+        """The full URL for an API path (or a full URL) and its query parameters."""
+        url = urljoin(self.base_url + '/', path.lstrip('/')) if '://' not in path else path
+        if params:
+            url += ('&' if '?' in url else '?') + urlencode(params, safe='/')
+        return url
+
+    def _cached(self, url: str, verbose: bool = False, keys: tuple = None):
+        """
+        The cached response for `url`, an empty one on an offline miss, or `None` to go to the network.
+        `keys` are the cache keys to try in order, just `url` by default.
+        """
+        if self.cache is None:
+            return None
+        cached = None
+        for key in keys or (url,):
+            cached = self.cache.get(key)
+            if cached is not None:
+                break
+        metrics.inc('conceptnet_cache_requests_total', result='miss' if cached is None else 'hit')
+        if cached is not None:
+            if verbose:
+                print(f'Cache hit for {url}')
+            return cached
+        if self.cache.offline:
+            if verbose:
+                print(f'Cache miss for {url} (offline)')
+            return {'edges': []}
+        return None
+
+    def _request(self, url: str, verbose: bool = False) -> requests.Response:
+        if self.scheduler is not None:
+            return self.scheduler.fetch(url, lambda url: self._send(url, verbose), self.priority)
+        return self._send(url, verbose)
+
+    def _send(self, url: str, verbose: bool = False) -> requests.Response:
+        if verbose:
+            print(f'Querying {url}')
+        start = time.perf_counter()
+        res = self.session.get(url, timeout=self.timeout)
+        elapsed = time.perf_counter() - start
+        if verbose:
+            print(f'Response received after {elapsed}s.')
+        if metrics.ENABLED:
+            metrics.observe('conceptnet_request_seconds', elapsed, backend='http')
+            metrics.inc('conceptnet_response_bytes_total', len(res.content))
+            retries = getattr(res.raw, 'retries', None)
+            if retries is not None and retries.history:
+                metrics.inc('conceptnet_retries_total', len(retries.history))
+        return res
+
+    def get(self, url: str, verbose: bool = False) -> dict:
+        """
+        The JSON response for `url` (a full URL or an API path).
+        If the client has a cache, it is checked first, and successful responses are stored in it.
+        In offline mode a cache miss gives an empty result instead of a request.
+        """
+        url = self.url(url)
+        self.lookups += 1
+        cached = self._cached(url, verbose)
+        if cached is not None:
+            return cached
+        res = self._request(url, verbose)
+        data = res.json()
+        if res.ok and self.cache is not None:
+            self.cache.put(url, data)
+        return data
+
+    def page(self, url: str, verbose: bool = False) -> Page:
+        """
+        Like `get`, but only the edges, as compact records (see `conceptnet.edges`).
+        Only those fields are cached, so the cached response is smaller too. It is cached under its own
+        key (`url` + `PAGE_KEY`), so `get` still finds full responses; a full one cached by `get` is used too.
+        """
+        url = self.url(url)
+        self.lookups += 1
+        cached = self._cached(url, verbose, keys=(url + PAGE_KEY, url))
+        if cached is not None:
+            return compact_page(cached)
+        res = self._request(url, verbose)
+        page = decode_page(res.content)
+        if res.ok and self.cache is not None:
+            self.cache.put(url + PAGE_KEY, page_response(page))
+        return page
+
+    def term(self, term: str, lang: str = 'en', verbose: bool = False) -> dict:
+        """The first page of edges for a term, e.g. `/c/en/dog`."""
+        return self.get(f'/c/{lang}/{term}', verbose=verbose)
+
+    def query_url(self, start=None, end=None, rel=None, node=None, other=None, lang='en', limit=None) -> str:
+        """The `/query` URL for the given terms and relation."""
+        params = {}
+        if start:
+            params['start'] = f'/c/{lang}/{start}'
+        if end:
+            params['end'] = f'/c/{lang}/{end}'
+        if rel:
+            params['rel'] = f'/r/{rel}'
+        if node:
+            params['node'] = f'/c/{lang}/{node}'
+        if other:
+            params['other'] = f'/c/{lang}/{other}'
+        if limit:
+            params['limit'] = limit
+        return self.url('/query', params)
+
+    def query(self, start=None, end=None, rel=None, node=None, other=None, lang='en', limit=None,
+              verbose=False) -> dict:
+        """The first page of a `/query` request."""
+        return self.get(self.query_url(start, end, rel, node, other, lang, limit), verbose=verbose)
+
+    def edges(self, url: str, max_pages: int = None, verbose: bool = False):
+        """
+        Yields the edges of `url` one at a time, fetching the next page only once
+        the previous one is used up. Stop iterating to stop fetching.
+
+        Params:
+            url: A full URL or API path, e.g. from `query_url`.
+            max_pages: Fetch at most this many pages.
+        """
+        pages = 0
+        while url and (max_pages is None or pages < max_pages):
+            res = self.get(url, verbose=verbose)
+            pages += 1
+            yield from res.get('edges', ())
+            url = res.get('view', {}).get('nextPage')
+
+    def edge_records(self, url: str, max_pages: int = None, verbose: bool = False):
+        """Like `edges`, but yields compact `Edge` records (see `conceptnet.edges`)."""
+        pages = 0
+        while url and (max_pages is None or pages < max_pages):
+            page = self.page(url, verbose=verbose)
+            pages += 1
+            yield from page.edges
+            url = page.next_page
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,122 @@
+"""
+Compact ConceptNet edges: only the fields the games read, as small tuples.
+
+An API response carries much more than the games look at: `@context`, every edge's
+`sources`, `dataset`, `license` and `surfaceText`, every node's `sense_label` and `term`.
+Decoded with `json.loads`, a page of 1000 edges is around 10,000 dicts, all kept alive
+until the caller is done with the page.
+
+`decode_page` decodes a response with an `object_hook` that turns each node into a `Node`
+and each edge into an `Edge` as soon as the parser finishes it, so the edge's dicts
+(sources and all) are freed straight away and only the records are kept. Nodes are shared
+within a page: the term a query is about is stored once, not once per edge.
+`compact_page` does the same for a response that is already decoded (e.g. a cached one).
+
+`python -m conceptnet.bench_edges` measures the difference.
+"""
+
+import json
+from typing import NamedTuple
+
+
+class Node(NamedTuple):
+    uri: str
+    label: str
+    language: str
+
+
+class Edge(NamedTuple):
+    uri: str
+    rel: str
+    start: Node
+    end: Node
+    weight: float
+
+    @property
+    def rel_label(self) -> str:
+        """`IsA` for `/r/IsA`."""
+        return self.rel.rsplit('/', 1)[-1]
+
+    def node(self, side: str) -> Node:
+        """The `start` or `end` node."""
+        return self.start if side == 'start' else self.end
+
+
+class Page(NamedTuple):
+    edges: list
+    # The path of the next page of results, if there is one.
+    next_page: str = None
+
+
+def _edge_hook():
+    """An `object_hook` that builds `Node`s and `Edge`s, sharing nodes seen before."""
+    nodes = {}
+
+    def node(obj) -> Node:
+        # Terms are already `Node`s; any other end (e.g. an `ExternalURL`'s web address) is still a dict.
+        if isinstance(obj, Node):
+            return obj
+        found = nodes.get(obj['@id'])
+        if found is None:
+            found = nodes[obj['@id']] = Node(obj['@id'], obj.get('label'), obj.get('language'))
+        return found
+
+    def hook(obj: dict):
+        uri = obj.get('@id')
+        if uri is None:
+            return obj
+        if uri.startswith('/c/'):
+            if 'label' not in obj:
+                # A `/c/` request's response itself (with the same `@id` as the term's node), or its `view`.
+                return obj
+            found = nodes.get(uri)
+            if found is None:
+                found = nodes[uri] = Node(uri, obj['label'], obj.get('language'))
+            return found
+        if uri.startswith('/a/'):
+            # The edge's dict (and its `sources`) is dropped here.
+            return Edge(uri, obj['rel'], node(obj['start']), node(obj['end']), obj.get('weight', 1.0))
+        if uri.startswith('/r/'):
+            return uri
+        return obj
+    return hook
+
+
+def decode_page(data) -> Page:
+    """The compact `Page` of a response's JSON (bytes or str)."""
+    response = json.loads(data, object_hook=_edge_hook())
+    edges = response.get('edges', [])
+    view = response.get('view')
+    return Page(edges, view.get('nextPage') if isinstance(view, dict) else None)
+
+
+def compact_page(response: dict) -> Page:
+    """The compact `Page` of an already-decoded response."""
+    nodes = {}
+
+    def node(obj: dict) -> Node:
+        found = nodes.get(obj['@id'])
+        if found is None:
+            found = nodes[obj['@id']] = Node(obj['@id'], obj.get('label'), obj.get('language'))
+        return found
+
+    edges = [Edge(edge['@id'], edge['rel']['@id'], node(edge['start']), node(edge['end']), edge.get('weight', 1.0))
+             for edge in response.get('edges', ())]
+    return Page(edges, response.get('view', {}).get('nextPage'))
+
+
+def page_response(page: Page) -> dict:
+    """An API-shaped response with just the fields of `page`, e.g. for the cache."""
+    def node(n: Node) -> dict:
+        return {'@id': n.uri, 'label': n.label, 'language': n.language}
+
+    response = {'edges': [{
+        '@id': edge.uri,
+        'rel': {'@id': edge.rel, 'label': edge.rel_label},
+        'start': node(edge.start),
+        'end': node(edge.end),
+        'weight': edge.weight,
+    } for edge in page.edges]}
+    if page.next_page:
+        response['view'] = {'nextPage': page.next_page}
+    return response
@@ -0,0 +1,247 @@
+"""
+An offline ConceptNet backend built from a local assertions dump.
+
+`ingest` streams a ConceptNet assertions CSV (e.g. `conceptnet-assertions-5.7.0.csv.gz`
+from https://github.com/commonsense/conceptnet5/wiki/Downloads, or any sample of it)
+into a SQLite database, keeping only edges between terms in the requested languages.
+Edges are indexed by (start, rel) and (end, rel).
+
+`OfflineConceptNet` answers the same `/query` and `/c/` requests as `ConceptNetClient`,
+with responses shaped like the API's, so it can stand in for it anywhere.
+
+Usage:
+`python -m conceptnet.offline <assertions.csv[.gz]> <database> [--lang en ...]`
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import metrics
+from conceptnet.client import DEFAULT_BASE_URL, ConceptNetClient
+from conceptnet.edges import Edge, Node, Page
+
+# The API's default page size.
+DEFAULT_LIMIT = 20
+BATCH_SIZE = 50_000
+
+_SURFACE_TERMS = re.compile(r'\[\[(.*?)\]\]')
+
+
+def split_node(uri: str):
+    """`/c/en/ice_cream/n/wn/food` -> (`/c/en/ice_cream`, `en`, `ice cream`)."""
+    parts = uri.split('/', 5)
+    if len(parts) < 4:
+        return uri, None, uri
+    return '/'.join(parts[:4]), parts[2], parts[3].replace('_', ' ')
+
+
+def read_assertions(path: str, langs=('en',)):
+    """
+    Yields (uri, rel, start, end, start_label, end_label, weight) for every assertion
+    in the CSV at `path` whose terms are both in `langs`.
+    """
+    langs = set(langs)
+    opener = gzip.open if path.endswith('.gz') else open
+    csv.field_size_limit(sys.maxsize)
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        for row in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+            if len(row) < 5:
+                continue
+            uri, rel, start_uri, end_uri, info = row[:5]
+            start, start_lang, start_label = split_node(start_uri)
+            if start_lang not in langs:
+                continue
+            end, end_lang, end_label = split_node(end_uri)
+            if end_lang not in langs:
+                continue
+            info = json.loads(info)
+            # The surface text, when there is one, has the labels as they were written.
+            surface = _SURFACE_TERMS.findall(info.get('surfaceText') or '')
+            if len(surface) == 2:
+                start_label, end_label = surface
+            yield uri, rel, start, end, start_label, end_label, info.get('weight', 1.0)
+
+
+def ingest(path: str, db_path: str, langs=('en',), verbose: bool = True) -> int:
+    """
+    Load the assertions CSV at `path` into the database at `db_path`, replacing its contents.
+    Returns the number of edges kept.
+    """
+    db = sqlite3.connect(db_path)
+    db.execute('PRAGMA journal_mode=OFF')
+    db.execute('PRAGMA synchronous=OFF')
+    db.execute('DROP TABLE IF EXISTS edges')
+    db.execute('CREATE TABLE edges (uri TEXT, rel TEXT, start TEXT, end TEXT, '
+               'start_label TEXT, end_label TEXT, weight REAL)')
+
+    start = time.time()
+    count = 0
+    batch = []
+    for edge in read_assertions(path, langs):
+        batch.append(edge)
+        if len(batch) == BATCH_SIZE:
+            db.executemany('INSERT INTO edges VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+            count += len(batch)
+            batch.clear()
+            if verbose:
+                print(f'{count} edges after {time.time() - start:.0f}s', end='\r')
+    db.executemany('INSERT INTO edges VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+    count += len(batch)
+
+    if verbose:
+        print(f'{count} edges after {time.time() - start:.0f}s. Indexing...')
+    # Indexing once at the end is much faster than keeping the indexes up to date while inserting.
+    db.execute('CREATE INDEX edges_start_rel ON edges (start, rel)')
+    db.execute('CREATE INDEX edges_end_rel ON edges (end, rel)')
+    db.commit()
+    db.execute('ANALYZE')
+    db.close()
+    if verbose:
+        print(f'Done after {time.time() - start:.0f}s.')
+    return count
+
+
+class OfflineConceptNet(ConceptNetClient):
+    """
+    Answers ConceptNet API requests from a database built by `ingest`.
+    Has the same interface as `ConceptNetClient`, minus the network.
+    """
+    def __init__(self, db_path: str, base_url: str = None):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f'No ConceptNet database at {db_path}; build one with `python -m conceptnet.offline`.')
+        # URLs resolve against the public API by default, whatever `$CONCEPTNET_URL` says.
+        # Nothing is cached or scheduled: every lookup is local.
+        super().__init__(base_url or DEFAULT_BASE_URL)
+        self.db_path = db_path
+        # SQLite connections can't be shared between threads, so each thread opens its own.
+        self._local = threading.local()
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+        return db
+
+    def _params(self, url: str):
+        """The path and query parameters of a `/query` or `/c/` URL."""
+        parts = urlsplit(self.url(url))
+        params = dict(parse_qsl(parts.query))
+        if parts.path.startswith('/c/'):
+            params['node'] = parts.path.rstrip('/')
+        return parts.path, params
+
+    def get(self, url: str, verbose: bool = False) -> dict:
+        """The API-shaped response for a `/query` or `/c/` URL."""
+        path, params = self._params(url)
+        self.lookups += 1
+        if verbose:
+            print(f'Looking up {path}?{urlencode(params, safe="/")}')
+        start = time.perf_counter()
+        response = self.lookup(params, path)
+        elapsed = time.perf_counter() - start
+        if verbose:
+            print(f'Found {len(response["edges"])} edges after {elapsed}s.')
+        metrics.observe('conceptnet_request_seconds', elapsed, backend='offline')
+        return response
+
+    def page(self, url: str, verbose: bool = False) -> Page:
+        """Like `get`, but with compact records built straight from the rows (see `conceptnet.edges`)."""
+        path, params = self._params(url)
+        self.lookups += 1
+        if verbose:
+            print(f'Looking up {path}?{urlencode(params, safe="/")}')
+        start = time.perf_counter()
+        rows, next_page = self._rows(params, path)
+        nodes = {}
+        page = Page([_record(row, nodes) for row in rows], next_page)
+        elapsed = time.perf_counter() - start
+        if verbose:
+            print(f'Found {len(page.edges)} edges after {elapsed}s.')
+        metrics.observe('conceptnet_request_seconds', elapsed, backend='offline')
+        return page
+
+    def lookup(self, params: dict, path: str = '/query') -> dict:
+        """The response for a dict of query parameters (`start`, `end`, `rel`, `node`, `other`, `limit`, `offset`)."""
+        rows, next_page = self._rows(params, path)
+        response = {'@id': path, 'edges': [_edge(row) for row in rows]}
+        if next_page:
+            response['view'] = {'nextPage': next_page}
+        return response
+
+    def _rows(self, params: dict, path: str):
+        """The rows of one page of results, and the path of the next page (or `None`)."""
+        clauses, args = [], []
+        for param in ('start', 'end', 'rel'):
+            if params.get(param):
+                value = params[param] if param == 'rel' else split_node(params[param])[0]
+                clauses.append(f'{param} = ?')
+                args.append(value)
+        for param in ('node', 'other'):
+            if params.get(param):
+                node = split_node(params[param])[0]
+                clauses.append('(start = ? OR end = ?)')
+                args += [node, node]
+
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+        offset = int(params.get('offset', 0))
+        where = ' AND '.join(clauses) or '1'
+        # Fetch one extra row to know whether there is a next page.
+        rows = self._db().execute(
+            f'SELECT uri, rel, start, end, start_label, end_label, weight FROM edges WHERE {where} '
+            f'LIMIT ? OFFSET ?', args + [limit + 1, offset]).fetchall()
+        if len(rows) <= limit:
+            return rows, None
+        query = urlencode({**params, 'offset': offset + limit, 'limit': limit}, safe='/')
+        return rows[:limit], f'{path}?{query}'
+
+    def close(self) -> None:
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+def _node(uri: str, label: str) -> dict:
+    lang = split_node(uri)[1]
+    return {'@id': uri, 'label': label, 'language': lang, 'term': uri}
+
+
+def _record(row, nodes: dict) -> Edge:
+    """The compact `Edge` for a row, sharing the `Node`s in `nodes`."""
+    uri, rel, start, end, start_label, end_label, weight = row
+    ends = []
+    for node, label in ((start, start_label), (end, end_label)):
+        found = nodes.get(node)
+        if found is None:
+            found = nodes[node] = Node(node, label, split_node(node)[1])
+        ends.append(found)
+    return Edge(uri, rel, ends[0], ends[1], weight)
+
+
+def _edge(row) -> dict:
+    uri, rel, start, end, start_label, end_label, weight = row
+    return {
+        '@id': uri,
+        'rel': {'@id': rel, 'label': rel.rsplit('/', 1)[-1]},
+        'start': _node(start, start_label),
+        'end': _node(end, end_label),
+        'weight': weight,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build an offline ConceptNet database from an assertions dump.')
+    parser.add_argument('assertions', help='the assertions CSV, optionally gzipped')
+    parser.add_argument('database', help='the SQLite database to create')
+    parser.add_argument('--lang', action='append', help='languages to keep (default: en)')
+    args = parser.parse_args()
+    ingest(args.assertions, args.database, langs=args.lang or ('en',))
@@ -0,0 +1,183 @@
+"""
+Schedules requests to the ConceptNet API within its rate limits.
+
+The public API allows 3600 requests an hour, in bursts of at most 120 a minute.
+A `Scheduler` keeps one token bucket per limit and lets a request through only once
+every bucket has a token, so a long batch run slows down to the limits instead of
+running into 429s and retry backoff.
+
+Requests wait in priority order: `INTERACTIVE` (a player waiting on a game) before
+`BACKGROUND` (prefetching, refreshing the viability index) before `BATCH` (bulk generation),
+oldest first within a priority. Identical URLs already waiting or in flight are coalesced:
+the later callers share the first one's response instead of spending a token each
+(and a waiting request is moved up if an identical one arrives with a higher priority).
+
+Give clients the same scheduler (e.g. `default_scheduler()`) so they share the budget:
+
+    client = ConceptNetClient(cache=QueryCache(), scheduler=default_scheduler(), priority=BATCH)
+
+Only requests that reach the network are scheduled; cache hits never wait.
+The limits are per process: processes sharing the API should each take a `share` of them.
+
+Queue depth, wait times and coalesced requests are recorded in `metrics`
+(and `Scheduler.stats()`).
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+
+INTERACTIVE, BACKGROUND, BATCH = 0, 1, 2
+PRIORITY_NAMES = ('interactive', 'background', 'batch')
+
+# (requests, per seconds) for each of the public API's limits.
+API_LIMITS = ((120, 60), (3600, 60 * 60))
+
+
+class TokenBucket:
+    """Holds up to `capacity` tokens, refilled at `capacity / period` per second; starts full."""
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, capacity: float, period: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until there is a token (0 if there is one now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class _Pending:
+    """A URL waiting for its turn or in flight, and what its callers will get."""
+    __slots__ = ('ticket', 'future')
+
+    def __init__(self, ticket: list):
+        # [priority, arrival]: ordered in the queue as a list, so the priority can be raised in place.
+        self.ticket = ticket
+        self.future = Future()
+
+
+class Scheduler:
+    """
+    Lets requests through at most as fast as the rate limits allow, highest priority first.
+    Safe to share between threads.
+
+    Params:
+        limits: (requests, per seconds) pairs; the public API's by default.
+        share: The fraction of the limits this process may use (e.g. 1/4 for one of 4 workers).
+        clock: A monotonic clock in seconds.
+    """
+    def __init__(self, limits=API_LIMITS, share: float = 1.0, clock=time.monotonic):
+        self._clock = clock
+        now = clock()
+        self.buckets = [TokenBucket(max(1.0, requests * share), period, now) for requests, period in limits]
+        self._cond = threading.Condition()
+        # Heap of tickets waiting for a token.
+        self._queue = []
+        # URL -> _Pending, while it waits or is in flight.
+        self._pending = {}
+        self._arrivals = itertools.count()
+        self.requests = 0
+        self.coalesced = 0
+        self.waited = 0.0
+        self.max_queued = 0
+
+    def fetch(self, url: str, send, priority: int = INTERACTIVE):
+        """
+        `send(url)` once the rate limits allow, or the result of an identical request
+        already waiting or in flight. Exceptions from `send` are raised to every caller sharing it.
+        """
+        with self._cond:
+            pending = self._pending.get(url)
+            if pending is None:
+                pending = self._pending[url] = _Pending([priority, next(self._arrivals)])
+                owner = True
+            else:
+                owner = False
+                self.coalesced += 1
+                if priority < pending.ticket[0]:
+                    pending.ticket[0] = priority
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+        if not owner:
+            metrics.inc('conceptnet_coalesced_total')
+            return pending.future.result()
+
+        try:
+            self._acquire(pending.ticket)
+            result = send(url)
+        except BaseException as e:
+            pending.future.set_exception(e)
+            raise
+        else:
+            pending.future.set_result(result)
+            return result
+        finally:
+            with self._cond:
+                del self._pending[url]
+
+    def _acquire(self, ticket: list) -> None:
+        """Wait until `ticket` is first in line and every bucket has a token, then take them."""
+        with self._cond:
+            start = self._clock()
+            heapq.heappush(self._queue, ticket)
+            self._queue_changed()
+            while True:
+                if self._queue[0] is ticket:
+                    now = self._clock()
+                    delay = max(bucket.delay(now) for bucket in self.buckets)
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+            for bucket in self.buckets:
+                bucket.take()
+            heapq.heappop(self._queue)
+            self._queue_changed()
+            # The next in line has to check the buckets for itself.
+            self._cond.notify_all()
+            waited = self._clock() - start
+            self.requests += 1
+            self.waited += waited
+        metrics.observe('conceptnet_schedule_wait_seconds', waited, priority=PRIORITY_NAMES[ticket[0]])
+
+    def _queue_changed(self) -> None:
+        self.max_queued = max(self.max_queued, len(self._queue))
+        metrics.set_gauge('conceptnet_queue_depth', len(self._queue))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'queued': len(self._queue),
+                'in_flight': len(self._pending) - len(self._queue),
+                'max_queued': self.max_queued,
+                'requests': self.requests,
+                'coalesced': self.coalesced,
+                'mean_wait': self.waited / self.requests if self.requests else 0.0,
+            }
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> Scheduler:
+    """One scheduler per process, with the public API's limits, for every client to share."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Scheduler()
+        return _default
+
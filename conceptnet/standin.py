@@ -0,0 +1,237 @@
+"""
+A local HTTP stand-in for the ConceptNet API, for repeatable benchmarks.
+
+It answers `/query` and `/c/` requests like the API does, from the first of these that can:
+
+- a recording: a `QueryCache` file of responses saved earlier. With `record=True`
+  (`--record`), requests it doesn't have are passed on to the real API and saved,
+  so one run against the live API records what later runs replay;
+- a database built by `python -m conceptnet.offline`;
+- made-up edges, seeded by the URL, so the same request always gets the same answer.
+
+Every response can be delayed (`latency` plus up to `jitter` seconds) and a fraction
+of them (`error_rate`) can fail with `error_status`, to see how the games cope.
+Point a client at it with `base_url`, or point every client at it with `$CONCEPTNET_URL`.
+
+Usage:
+`python -m conceptnet.standin [--recording <file> [--record]] [--db <file>] [--no-synthetic] [--port <port>]
+ [--latency <ms>] [--jitter <ms>] [--error-rate <fraction>] [--error-status <status>]`
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from conceptnet.cache import QueryCache
+from conceptnet.client import DEFAULT_BASE_URL, PAGE_KEY, ConceptNetClient
+from conceptnet.offline import DEFAULT_LIMIT, OfflineConceptNet, _edge, split_node
+
+# The relations made-up edges use when a query doesn't name one.
+SYNTHETIC_RELS = ('IsA', 'PartOf', 'HasA', 'AtLocation', 'CapableOf', 'UsedFor', 'RelatedTo', 'Synonym')
+# How many words made-up edges draw from; smaller means more overlap between queries.
+SYNTHETIC_VOCAB = 5000
+
+
+def _label(uri: str) -> str:
+    """`/c/en/ice_cream` -> `ice cream`."""
+    return uri.split('/')[3].replace('_', ' ')
+
+
+def synthetic_response(path: str, params: dict) -> dict:
+    """
+    A made-up response to a `/query` or `/c/` request, the same every time for the same request.
+    About a quarter of queries have fewer than 4 edges, like many real (word, relation) pairs.
+    """
+    if path.startswith('/c/'):
+        params = {**params, 'node': path.rstrip('/')}
+    known = {k: params[k] for k in ('start', 'end', 'rel', 'node', 'other') if params.get(k)}
+    key = urlencode(sorted(known.items()), safe='/')
+    rng = random.Random(zlib.crc32(key.encode('utf-8')))
+    total = rng.randint(0, 3) if rng.random() < 0.25 else int(4 + rng.expovariate(1 / 25))
+
+    limit = int(params.get('limit', DEFAULT_LIMIT))
+    offset = int(params.get('offset', 0))
+    edges = []
+    for i in range(offset, min(offset + limit, total)):
+        # Each edge depends only on the request and its position, not on the page size.
+        edge_rng = random.Random(f'{key}#{i}')
+        rel = known.get('rel') or f'/r/{edge_rng.choice(SYNTHETIC_RELS)}'
+        word = f'/c/en/word{edge_rng.randrange(SYNTHETIC_VOCAB)}'
+        fixed = known.get('start') or known.get('end') or known.get('node') or '/c/en/thing'
+        if 'end' in known or ('start' not in known and edge_rng.random() < 0.5):
+            start, end = word, known.get('end', fixed)
+        else:
+            start, end = known.get('start', fixed), word
+        start, end = split_node(start)[0], split_node(end)[0]
+        edges.append(_edge((f'/a/[{rel}/,{start}/,{end}/]', rel, start, end,
+                            _label(start), _label(end), round(edge_rng.uniform(0.5, 5), 3))))
+
+    response = {'@id': path, 'edges': edges}
+    if offset + limit < total:
+        query = urlencode({**params, 'offset': offset + limit, 'limit': limit}, safe='/')
+        response['view'] = {'nextPage': f'{path}?{query}'}
+    return response
+
+
+class StandInServer:
+    """
+    Serves ConceptNet-shaped responses on a local port, in a background thread.
+
+        with StandInServer(db='conceptnet.db', latency=0.05) as server:
+            client = ConceptNetClient(base_url=server.base_url)
+
+    Params:
+        recording: A `QueryCache` file to answer from (and, with `record`, to save live responses to).
+        record: Pass requests the recording doesn't have on to `upstream`, and save the responses.
+        upstream: The real API, for `record`.
+        db: An offline ConceptNet database (see `conceptnet/offline.py`).
+        synthetic: Make up an answer when nothing else has one; otherwise answer 404.
+        latency: Seconds to wait before every response.
+        jitter: Up to this many more seconds, at random.
+        error_rate: The fraction of requests to fail with `error_status`.
+        error_status: e.g. 503, or 429 to look like rate limiting.
+        host, port: Where to listen; port 0 picks a free one.
+        seed: Seeds the latency and error injection.
+    """
+    def __init__(self, recording: str = None, record: bool = False, upstream: str = DEFAULT_BASE_URL,
+                 db: str = None, synthetic: bool = True, latency: float = 0, jitter: float = 0,
+                 error_rate: float = 0, error_status: int = 503, host: str = '127.0.0.1', port: int = 0,
+                 seed: int = 0):
+        self.recording = None
+        self.upstream = None
+        if recording:
+            # Recorded responses never expire.
+            self.recording = QueryCache(recording, ttl=float('inf'), offline=not record)
+            if record:
+                self.upstream = ConceptNetClient(base_url=upstream, cache=self.recording)
+        self.db = OfflineConceptNet(db) if db else None
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Requests answered, by source ('recording', 'upstream', 'db', 'synthetic', 'missing', 'error').
+        self.counts = {}
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def respond(self, path: str, query: str):
+        """The (status, response, source) for a request."""
+        with self._lock:
+            fail = self._rng.random() < self.error_rate
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return self.error_status, {'error': {'status': self.error_status, 'details': 'injected error'}}, 'error'
+
+        url = f'{path}?{query}' if query else path
+        if self.recording is not None:
+            # A games' cache works as a recording too; its compact pages have all the games read.
+            response = self.recording.get(url) or self.recording.get(url + PAGE_KEY)
+            if response is not None:
+                return 200, response, 'recording'
+        if self.upstream is not None:
+            return 200, self.upstream.get(url), 'upstream'
+        if self.db is not None:
+            params = dict(parse_qsl(query))
+            if path.startswith('/c/'):
+                params['node'] = path.rstrip('/')
+            return 200, self.db.lookup(params, path), 'db'
+        if self.synthetic:
+            return 200, synthetic_response(path, dict(parse_qsl(query))), 'synthetic'
+        return 404, {'error': {'status': 404, 'details': 'not recorded'}}, 'missing'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real API, so the client's pooled connections get reused.
+            protocol_version = 'HTTP/1.1'
+            # The headers and body go out as separate writes; don't let Nagle hold the body back.
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if not (parts.path == '/query' or parts.path.startswith('/c/')):
+                    status, response, source = 404, {'error': {'status': 404, 'details': 'unknown path'}}, 'missing'
+                else:
+                    status, response, source = server.respond(parts.path, parts.query)
+                with server._lock:
+                    server.counts[source] = server.counts.get(source, 0) + 1
+                body = json.dumps(response).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread = None
+        self.httpd.server_close()
+        if self.upstream is not None:
+            self.upstream.close()
+        if self.db is not None:
+            self.db.close()
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve ConceptNet API responses locally.')
+    parser.add_argument('--recording', metavar='FILE', help='answer from responses saved in this file')
+    parser.add_argument('--record', action='store_true',
+                        help='fetch what the recording lacks from the real API, and save it')
+    parser.add_argument('--upstream', default=DEFAULT_BASE_URL, help='the real API, for --record')
+    parser.add_argument('--db', metavar='FILE', help='answer from a local ConceptNet database')
+    parser.add_argument('--no-synthetic', dest='synthetic', action='store_false',
+                        help='answer 404 instead of making up edges')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8084)
+    parser.add_argument('--latency', type=float, default=0, metavar='MS')
+    parser.add_argument('--jitter', type=float, default=0, metavar='MS')
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = StandInServer(args.recording, args.record, args.upstream, args.db, args.synthetic,
+                           args.latency / 1000, args.jitter / 1000, args.error_rate, args.error_status,
+                           args.host, args.port, args.seed)
+    print(f'Serving ConceptNet on {server.base_url} (set CONCEPTNET_URL={server.base_url})')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
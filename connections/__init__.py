@@ -0,0 +1,3 @@
+"""
+Connections puzzles generated from ConceptNet. Run from the repository root with `python -m connections`.
+"""
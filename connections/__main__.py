@@ -0,0 +1,5 @@
+"""`python -m connections`: generates a game of Connections (see `connections/connections.py`)."""
+
+from .connections import main
+
+main()
@@ -0,0 +1,200 @@
+"""
+Generates many Connections puzzles at once, for use later.
+
+Puzzles are generated on a pool of worker processes, one random seed per puzzle,
+and appended to a JSONL file as they finish, one puzzle per line:
+
+    {"seed": 12, "queries": 9, "categories": [{"word": "time", "anchor": "start", "rel": "IsA", "terms": [...]}, ...]}
+
+A puzzle whose set of categories (word, anchor and relation) was already generated is dropped,
+and with `--unique`, so is one with more than one solution.
+Rerunning with the same output file resumes: seeds already in the file are skipped,
+and their categories still count as generated.
+
+Usage:
+`python -m connections.batch <number of puzzles> [-o puzzles.jsonl] [--workers <n>] [--seed <first seed>] [--offline | --db <file>] [--index [<file>]] [--unique]`
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from conceptnet.scheduler import BATCH, Scheduler
+from . import connections
+from .solver import cached_lookup, is_unique
+from .viability import ViabilityIndex, connections_from_index, default_index_path
+
+# Stop once this many puzzles per requested one have been dropped.
+MAX_WASTE = 10
+
+
+# The viability index, if the worker uses one.
+INDEX = None
+# The solver's tile lookup, if the worker rejects ambiguous puzzles.
+LOOKUP = None
+
+
+def init_worker(offline: bool = False, db: str = None, index: str = None, unique: bool = False,
+                workers: int = 1) -> None:
+    """
+    Give each worker process its own ConceptNet client (and viability index and solver lookups).
+    The workers split the API's rate limits between them, at batch priority.
+    """
+    global INDEX, LOOKUP
+    if unique:
+        LOOKUP = cached_lookup()
+    if index:
+        INDEX = ViabilityIndex.load(index)
+    if db:
+        connections.CLIENT = connections.OfflineConceptNet(db)
+    else:
+        connections.CACHE = connections.QueryCache(offline=offline)
+        connections.CLIENT = connections.ConceptNetClient(
+            cache=connections.CACHE, scheduler=Scheduler(share=1 / workers), priority=BATCH)
+
+
+def generate(seed: int):
+    """
+    The puzzle for `seed`, as a dict ready to be written out,
+    or `None` if no puzzle could be made from the word list.
+    If the worker checks puzzles, an ambiguous one is just `{'seed': seed, 'ambiguous': True}`.
+    """
+    random.seed(seed)
+    before = connections.CLIENT.lookups
+    try:
+        cats = connections.connections() if INDEX is None else connections_from_index(INDEX)
+    except (IndexError, RuntimeError):
+        # ran out of words with enough terms
+        return None
+    if LOOKUP is not None and not is_unique(cats, LOOKUP):
+        return {'seed': seed, 'ambiguous': True}
+    return {
+        'seed': seed,
+        'queries': connections.CLIENT.lookups - before,
+        'categories': [
+            {'word': word, 'anchor': anchor, 'rel': rel, 'terms': terms}
+            for word, anchor, rel, terms in cats
+        ],
+    }
+
+
+def category_set(puzzle: dict) -> frozenset:
+    """What makes a puzzle a duplicate of another."""
+    return frozenset((cat['word'], cat['anchor'], cat['rel']) for cat in puzzle['categories'])
+
+
+def read_puzzles(path: str):
+    """
+    The puzzles already in `path`, and the length of the file they fill.
+    A partly written last line (from an interrupted run) is not counted.
+    """
+    puzzles = []
+    end = 0
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    puzzles.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+                end += len(line)
+    return puzzles, end
+
+
+def run(n: int, out: str, workers: int = None, first_seed: int = 0, offline: bool = False, db: str = None,
+        index: str = None, unique: bool = False, verbose: bool = True) -> dict:
+    """
+    Generate `n` new puzzles into `out`, resuming from what is already there.
+    With `unique`, puzzles with more than one solution (see `solver.py`) are dropped.
+    Returns a summary of the run.
+    """
+    done, end = read_puzzles(out)
+    seen_seeds = {puzzle['seed'] for puzzle in done}
+    seen_sets = {category_set(puzzle) for puzzle in done}
+    if os.path.exists(out):
+        # Drop any partly written last line before appending.
+        os.truncate(out, end)
+        if verbose and done:
+            print(f'Resuming after {len(done)} puzzles in {out}')
+
+    seeds = (seed for seed in itertools.count(first_seed) if seed not in seen_seeds)
+    workers = workers or os.cpu_count()
+    written = duplicates = ambiguous = failures = queries = 0
+    start = time.time()
+
+    with open(out, 'a', encoding='utf-8') as f, \
+            ProcessPoolExecutor(workers, initializer=init_worker, initargs=(offline, db, index, unique, workers)) as pool:
+        pending = set()
+        while written < n:
+            if duplicates + ambiguous + failures > MAX_WASTE * n:
+                print(f'\nGiving up after {duplicates} duplicates, {ambiguous} ambiguous puzzles '
+                      f'and {failures} failures; try a longer word list.', file=sys.stderr)
+                break
+            # Keep every worker busy, but don't start more puzzles than are still needed.
+            while len(pending) < min(workers, n - written):
+                pending.add(pool.submit(generate, next(seeds)))
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                puzzle = future.result()
+                if puzzle is None:
+                    failures += 1
+                    continue
+                if puzzle.get('ambiguous'):
+                    ambiguous += 1
+                    continue
+                key = category_set(puzzle)
+                if key in seen_sets:
+                    duplicates += 1
+                    continue
+                if written == n:
+                    continue
+                seen_sets.add(key)
+                f.write(json.dumps(puzzle) + '\n')
+                f.flush()
+                written += 1
+                queries += puzzle['queries']
+                if verbose and (written % 10 == 0 or written == n):
+                    elapsed = time.time() - start
+                    print(f'{written}/{n} puzzles, {written / elapsed:.2f} puzzles/s', end='\r')
+        for future in pending:
+            future.cancel()
+
+    elapsed = time.time() - start
+    summary = {
+        'puzzles': written,
+        'duplicates': duplicates,
+        'ambiguous': ambiguous,
+        'failures': failures,
+        'seconds': elapsed,
+        'puzzles_per_second': written / elapsed if elapsed else 0.0,
+        'queries_per_puzzle': queries / written if written else 0.0,
+    }
+    if verbose:
+        print(f'\n{written} puzzles in {elapsed:.1f}s ({summary["puzzles_per_second"]:.2f}/s), '
+              f'{summary["queries_per_puzzle"]:.1f} queries per puzzle, '
+              f'{duplicates} duplicates, {ambiguous} ambiguous and {failures} failures dropped')
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate many Connections puzzles into a JSONL file.')
+    parser.add_argument('n', type=int, help='how many new puzzles to generate')
+    parser.add_argument('-o', '--out', default='puzzles.jsonl', help='the JSONL file to append to')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=0, help='the first seed to try')
+    parser.add_argument('--offline', action='store_true', help='only use cached ConceptNet responses')
+    parser.add_argument('--db', metavar='FILE',
+                        help='answer queries from a local ConceptNet database (see conceptnet/offline.py)')
+    parser.add_argument('--index', nargs='?', const=default_index_path(), metavar='FILE',
+                        help='only pick categories the viability index knows work (see viability.py)')
+    parser.add_argument('--unique', action='store_true', help='drop puzzles with more than one solution')
+    args = parser.parse_args()
+    try:
+        run(args.n, args.out, args.workers, args.seed, args.offline, args.db, args.index, args.unique)
+    except KeyboardInterrupt:
+        sys.exit('\nInterrupted; rerun the same command to resume.')
@@ -0,0 +1,104 @@
+"""
+Benchmark for generating Connections games end to end, against a local ConceptNet stand-in.
+
+Every request goes over HTTP to a `conceptnet.standin` server (so the client's session,
+retries and JSON decoding are all measured), but nothing depends on the live API:
+answers come from a recording, an offline database or made-up edges, with optional
+latency and injected errors. No cache is used, so each run makes all of its requests.
+
+Three workloads are timed, each seeded so every run asks for the same things:
+
+- random_category:         one category for each of the first `--words` words of `WORDS`
+- connections:             whole games, one query at a time
+- connections_concurrent:  whole games, with `--workers` queries in flight
+
+Usage:
+`python -m connections.bench_connections [--runs <n>] [--latency <ms>] [--error-rate <fraction>]
+ [--rate <requests a minute>] [--recording <file> | --db <file>] [--url <running stand-in>] [--json <file>]`
+"""
+
+import argparse
+import json
+import random
+
+from bench import timed
+from conceptnet.client import ConceptNetClient
+from conceptnet.scheduler import Scheduler
+from conceptnet.standin import StandInServer
+from . import connections
+
+
+def timed_games(work, runs: int, seed: int) -> dict:
+    """`timed`, reseeding `random` before each run so every run asks the same queries; with requests per run."""
+    lookups = connections.CLIENT.lookups
+    results = timed(work, runs, before=lambda run: random.seed(seed + run))
+    results['requests'] = (connections.CLIENT.lookups - lookups) / runs
+    return results
+
+
+def every_category(words: list) -> None:
+    for word in words:
+        try:
+            connections.random_category(word)
+        except RuntimeError:
+            pass
+
+
+def run(base_url: str, args) -> dict:
+    """The results of every workload against the ConceptNet at `base_url`."""
+    scheduler = Scheduler(limits=((args.rate, 60),)) if args.rate else None
+    connections.CLIENT = ConceptNetClient(base_url=base_url, backoff=args.backoff, scheduler=scheduler)
+    words = connections.WORDS[:args.words]
+    results = {
+        'random_category': timed_games(lambda: every_category(words), args.runs, args.seed),
+        'connections': timed_games(connections.connections, args.runs, args.seed),
+        'connections_concurrent': timed_games(lambda: connections.connections_concurrent(max_workers=args.workers),
+                                              args.runs, args.seed),
+    }
+    if scheduler is not None:
+        results['scheduler'] = scheduler.stats()
+    connections.CLIENT.close()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark Connections games against a local ConceptNet.')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--words', type=int, default=20, help='words to find a category for, per run')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0, metavar='MS', help='added to every response')
+    parser.add_argument('--jitter', type=float, default=0, metavar='MS')
+    parser.add_argument('--error-rate', type=float, default=0, help='the fraction of requests that fail (503)')
+    parser.add_argument('--rate', type=int, metavar='N',
+                        help='schedule requests to at most N a minute (see conceptnet/scheduler.py)')
+    parser.add_argument('--backoff', type=float, default=0.01, help="the client's base delay between retries")
+    parser.add_argument('--recording', metavar='FILE', help='replay responses saved by `conceptnet.standin --record`')
+    parser.add_argument('--db', metavar='FILE', help='answer from a local ConceptNet database')
+    parser.add_argument('--url', help='use an already running stand-in instead of starting one')
+    parser.add_argument('--json', metavar='FILE', help='also write the results to this file')
+    args = parser.parse_args()
+
+    config = {k: v for k, v in vars(args).items() if k != 'json'}
+    if args.url:
+        results = run(args.url, args)
+        served = None
+    else:
+        with StandInServer(args.recording, db=args.db, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                           error_rate=args.error_rate, seed=args.seed) as server:
+            results = run(server.base_url, args)
+            served = server.counts
+
+    print(f'{"workload":<24}{"median (ms)":>12}{"mean (ms)":>12}{"requests":>10}')
+    for name, r in results.items():
+        if name == 'scheduler':
+            print(f'Scheduler: {r}')
+            continue
+        print(f'{name:<24}{r["median"] * 1000:>12.1f}{r["mean"] * 1000:>12.1f}{r["requests"]:>10.1f}')
+    if served:
+        print(f'Stand-in answered: {served}')
+
+    if args.json:
+        report = {'suite': 'connections', 'config': config, 'served': served, 'results': results}
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
@@ -0,0 +1,127 @@
+"""
+Exports Connections puzzles as a static site.
+
+Every page shares one stylesheet and one script (`static/game.css` and `static/game.js`);
+the puzzles themselves go in a compact data file, `puzzles.js`, and the page picks one
+with `?seed=<seed>` or `?index=<index>`.
+
+Usage:
+`python -m connections.export puzzles.jsonl [-o site]`
+(`puzzles.jsonl` as written by `batch.py`), then open `site/index.html`.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSETS = ('game.css', 'game.js')
+# The seed `create_game` shuffles single puzzles with.
+DEFAULT_SEED = 81
+
+_ROW = ('<tr class="game-row unrevealed">'
+        + '<td class="tile unselected" onclick="toggle(this)"></td>' * 4
+        + '</tr>')
+
+PAGE = f"""<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="utf-8">
+        <title>Connections</title>
+        {{style}}
+    </head>
+    <body>
+        <div id="game-container">
+            <table id="game-board">
+                {_ROW}
+                {_ROW}
+                {_ROW}
+                {_ROW}
+            </table>
+            <br>
+            <br>
+            <br>
+            <button onclick="scoreInput()">Submit</button>
+            <div id="puzzle-nav"></div>
+        </div>
+        {{scripts}}
+    </body>
+</html>
+"""
+
+
+def category_label(word: str, anchor: str, rel: str) -> str:
+    """How a category is named when it's revealed, e.g. `dog IsA _____`."""
+    if anchor == 'start':
+        return f'{word} {rel} _____'
+    return f'_____ {rel} {word}'
+
+
+def compact(puzzle: dict) -> list:
+    """A puzzle from `batch.py` as it is stored in `puzzles.js`: [seed, [[label, terms], ...]]."""
+    return [puzzle['seed'], [[category_label(cat['word'], cat['anchor'], cat['rel']), cat['terms']]
+                             for cat in puzzle['categories']]]
+
+
+def puzzles_js(puzzles: list) -> str:
+    """The `puzzles.js` script for a list of compact puzzles."""
+    data = json.dumps(puzzles, separators=(',', ':'), ensure_ascii=False)
+    # Keep a term like `</script>` from ending an inline script early.
+    return 'const PUZZLES = ' + data.replace('</', '<\\/') + ';\n'
+
+
+def _asset(name: str) -> str:
+    with open(os.path.join(STATIC, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def render_page(categories, seed: int = DEFAULT_SEED) -> str:
+    """
+    A self-contained page for one puzzle, with the shared stylesheet and script inlined.
+    A category is a (label string, list of terms).
+    """
+    data = puzzles_js([[seed, [[label, list(terms)] for label, terms in categories]]])
+    style = f'<style>\n{_asset("game.css")}</style>'
+    scripts = f'<script>\n{data}</script>\n<script>\n{_asset("game.js")}</script>'
+    return PAGE.format(style=style, scripts=scripts)
+
+
+def export(puzzles, out_dir: str) -> int:
+    """
+    Write a site for `puzzles` (dicts as written by `batch.py`) to `out_dir`:
+    `index.html`, the shared assets and `puzzles.js`. Returns the number of puzzles.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for name in ASSETS:
+        shutil.copyfile(os.path.join(STATIC, name), os.path.join(out_dir, name))
+    page = PAGE.format(
+        style='<link rel="stylesheet" href="game.css">',
+        scripts='<script src="puzzles.js"></script>\n        <script src="game.js"></script>',
+    )
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(page)
+    data = [compact(puzzle) for puzzle in puzzles]
+    with open(os.path.join(out_dir, 'puzzles.js'), 'w', encoding='utf-8') as f:
+        f.write(puzzles_js(data))
+    return len(data)
+
+
+def read_jsonl(path: str):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export Connections puzzles as a static site.')
+    parser.add_argument('puzzles', help='a JSONL file of puzzles, as written by batch.py')
+    parser.add_argument('-o', '--out', default='site', help='the directory to write the site to')
+    args = parser.parse_args()
+
+    start = time.time()
+    n = export(read_jsonl(args.puzzles), args.out)
+    size = sum(os.path.getsize(os.path.join(args.out, name)) for name in os.listdir(args.out))
+    print(f'Exported {n} puzzles to {args.out} ({size / 1024:.0f} KiB) in {time.time() - start:.2f}s')
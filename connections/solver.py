@@ -0,0 +1,191 @@
+"""
+A solver for Connections puzzles, used to reject puzzles with more than one solution.
+
+The 16 tiles are bits 0-15 of a mask, so every possible group of 4 tiles is a 16-bit
+mask. A group is a candidate if some ConceptNet category (a word, anchor and relation,
+as in `connections.py`) covers all 4 of its tiles. A solution is 4 disjoint candidates,
+i.e. an exact cover of the 16 bits, found by always covering the lowest uncovered tile
+next and only trying candidates compatible with every group chosen so far.
+
+Usage:
+`python -m connections.solver puzzles.jsonl [--offline | --db <file>]`
+checks every puzzle in a file written by `batch.py` and reports the ambiguous ones.
+"""
+
+import argparse
+import json
+import time
+from itertools import combinations
+
+from . import connections
+
+FULL = (1 << 16) - 1
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+def tile_categories(tile: str, rels=connections.RELS, verbose: bool = False) -> set:
+    """
+    The categories `tile` belongs to, as (word, anchor, rel) triples:
+    an edge `tile -rel-> word` puts it in (word, 'end', rel), and `word -rel-> tile` in (word, 'start', rel).
+    """
+    node = tile.replace(' ', '_').lower()
+    rels = set(rels)
+    cats = set()
+    url = connections.CLIENT.query_url(node=node)
+    for edge in connections.CLIENT.edge_records(url, max_pages=connections.MAX_PAGES, verbose=verbose):
+        rel = edge.rel_label
+        if rel not in rels:
+            continue
+        start, end = edge.start, edge.end
+        if end.label.lower() == tile.lower() and start.language == 'en':
+            cats.add((start.label, 'start', rel))
+        elif start.label.lower() == tile.lower() and end.language == 'en':
+            cats.add((end.label, 'end', rel))
+    return cats
+
+
+def tiles_of(puzzle) -> list:
+    """The 16 tiles of a puzzle, i.e. `connections()` output: (word, anchor, rel, terms) per category."""
+    return [term for _, _, _, terms in puzzle for term in terms]
+
+
+def category_masks(puzzle, lookup=tile_categories) -> dict:
+    """
+    Maps each category that covers at least 4 tiles to the mask of tiles it covers.
+    `lookup(tile)` gives the categories of a tile; the puzzle's own categories are always included.
+    """
+    masks = {}
+    for bit, tile in enumerate(tiles_of(puzzle)):
+        for cat in lookup(tile):
+            masks[cat] = masks.get(cat, 0) | 1 << bit
+    bit = 0
+    for word, anchor, rel, terms in puzzle:
+        mask = ((1 << len(terms)) - 1) << bit
+        masks[word, anchor, rel] = masks.get((word, anchor, rel), 0) | mask
+        bit += len(terms)
+    return {cat: mask for cat, mask in masks.items() if popcount(mask) >= 4}
+
+
+def groups(masks) -> list:
+    """Every 4-tile group some category covers, as sorted, distinct 16-bit masks."""
+    found = set()
+    for mask in masks:
+        bits = [1 << i for i in range(16) if mask >> i & 1]
+        if len(bits) == 4:
+            found.add(mask)
+        else:
+            found.update(a | b | c | d for a, b, c, d in combinations(bits, 4))
+    return sorted(found)
+
+
+class Groups:
+    """
+    Candidate groups with the tables the search uses.
+
+    `by_tile[i]` is the set of groups whose lowest tile is `i`, and `compatible[g]` the set of
+    groups disjoint from group `g`; both are bitsets over group indices.
+    """
+    def __init__(self, masks):
+        self.masks = list(masks)
+        n = len(self.masks)
+        self.by_tile = [0] * 16
+        for g, mask in enumerate(self.masks):
+            low = (mask & -mask).bit_length() - 1
+            self.by_tile[low] |= 1 << g
+        # Group g is compatible with the groups that share none of its tiles.
+        with_tile = [0] * 16
+        for g, mask in enumerate(self.masks):
+            for i in range(16):
+                if mask >> i & 1:
+                    with_tile[i] |= 1 << g
+        everything = (1 << n) - 1
+        self.compatible = []
+        for mask in self.masks:
+            overlapping = 0
+            for i in range(16):
+                if mask >> i & 1:
+                    overlapping |= with_tile[i]
+            self.compatible.append(everything & ~overlapping)
+
+    def partitions(self, limit: int = None):
+        """Yields solutions (tuples of 4 masks), at most `limit` of them."""
+        found = 0
+        stack = [(0, (1 << len(self.masks)) - 1, ())]
+        while stack:
+            covered, allowed, chosen = stack.pop()
+            if covered == FULL:
+                yield tuple(self.masks[g] for g in chosen)
+                found += 1
+                if limit is not None and found >= limit:
+                    return
+                continue
+            # Cover the lowest uncovered tile next; if no allowed group has it, this branch is dead.
+            low = (~covered & (covered + 1)).bit_length() - 1
+            options = self.by_tile[low] & allowed
+            while options:
+                g = (options & -options).bit_length() - 1
+                options &= options - 1
+                stack.append((covered | self.masks[g], allowed & self.compatible[g], chosen + (g,)))
+
+
+def solutions(puzzle, lookup=tile_categories, limit: int = None) -> list:
+    """The solutions of a puzzle, as tuples of 4 tile masks."""
+    tiles = tiles_of(puzzle)
+    if len(tiles) != 16:
+        raise ValueError(f'A puzzle has 16 tiles, not {len(tiles)}.')
+    return list(Groups(groups(category_masks(puzzle, lookup).values())).partitions(limit))
+
+
+def is_unique(puzzle, lookup=tile_categories) -> bool:
+    """
+    Whether the puzzle has exactly one solution (its own categories).
+    A puzzle with the same term on two tiles never is.
+    """
+    if len({tile.lower() for tile in tiles_of(puzzle)}) != 16:
+        return False
+    return len(solutions(puzzle, lookup, limit=2)) == 1
+
+
+def cached_lookup(rels=connections.RELS):
+    """`tile_categories`, remembering each tile's categories for the life of the function."""
+    memo = {}
+
+    def lookup(tile):
+        cats = memo.get(tile)
+        if cats is None:
+            cats = memo[tile] = tile_categories(tile, rels)
+        return cats
+    return lookup
+
+
+def from_json(puzzle: dict) -> list:
+    """A puzzle as written by `batch.py`, in `connections()` form."""
+    return [(cat['word'], cat['anchor'], cat['rel'], cat['terms']) for cat in puzzle['categories']]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that Connections puzzles have one solution.')
+    parser.add_argument('puzzles', help='a JSONL file of puzzles, as written by batch.py')
+    parser.add_argument('--offline', action='store_true', help='only use cached ConceptNet responses')
+    parser.add_argument('--db', metavar='FILE',
+                        help='answer queries from a local ConceptNet database (see conceptnet/offline.py)')
+    args = parser.parse_args()
+    connections.CACHE.offline = args.offline
+    if args.db:
+        connections.CLIENT = connections.OfflineConceptNet(args.db)
+
+    lookup = cached_lookup()
+    checked = ambiguous = 0
+    start = time.time()
+    with open(args.puzzles, encoding='utf-8') as f:
+        for line in f:
+            puzzle = json.loads(line)
+            checked += 1
+            if not is_unique(from_json(puzzle), lookup):
+                ambiguous += 1
+                print(f'seed {puzzle["seed"]} is ambiguous')
+    elapsed = time.time() - start
+    print(f'{checked} puzzles checked in {elapsed:.2f}s ({checked / elapsed:.1f}/s), {ambiguous} ambiguous')
@@ -0,0 +1,217 @@
+class Category {
+    constructor(color, name, items) {
+        this.color = color;
+        this.name = name;
+        this.items = items;
+    }
+
+    size() {
+        return this.items.size;
+    }
+
+    // How many items differ between these categories?
+    difference(cat2) {
+        if (cat2 instanceof Category && this.size() == cat2.size()) {
+            let diffs = 0;
+            for (const item of this.items.values()) {
+                if (!cat2.items.has(item)) {
+                    diffs += 1;
+                }
+            }
+            return diffs;
+        } else {
+            // if the categories have different sizes, the question doesn't make sense.
+            return -1;
+        }
+    }
+
+    terms() {
+        return this.items.values();
+    }
+
+    toString() {
+        return this.terms().reduce((acc, term) => acc + ", " + term, "").substring(2);
+    }
+};
+
+function toggle(tile) {
+    if (tile.className == "tile unselected") {
+        // Try to add the tile, and select it.
+        if (terms.size < 4 && !terms.has(tile.innerHTML)) {
+            terms.add(tile.innerHTML);
+            tile.className = "tile selected";
+        }
+
+    } else if (tile.className == "tile selected") {
+        // Reset the tile
+        tile.className = "tile unselected";
+        terms.delete(tile.innerHTML);
+    }
+}
+
+// this fails if any of the category lengths mismatch!
+function scoreInput() {
+    inputCat = new Category('gray', 'input', terms);
+
+    if (terms.size < CATS[0].size()) {
+        return "Invalid input!";
+    }
+
+    scoredCats = CATS.map((cat) => [inputCat.difference(cat), cat]);
+
+    match = scoredCats.find((x) => x[0] == 0);
+    oneAway = scoredCats.find((x) => x[0] == 1);
+
+    if (match) {
+        window.alert("Correct!");
+        revealCategory(match[1]);
+
+    } else if (oneAway) {
+        window.alert("One away!");
+    } else {
+        window.alert("Try again!");
+    }
+}
+
+function setUp(categories) {
+    // get the terms and randomize
+    allTerms = categories.reduce((acc, cat) => [...acc, ...cat.terms()], [])
+    allTerms = shuffle(allTerms);
+
+    let cells = document.getElementsByClassName("tile");
+    for (let i = 0; i < cells.length; i++) {
+        cells[i].insertAdjacentHTML('afterBegin', allTerms[i]);
+    }
+}
+
+// from https://www.geeksforgeeks.org/how-to-shuffle-an-array-using-javascript/
+function shuffle(array) { 
+    return array.sort(()=>seededRandom()-0.5);
+} 
+
+// Seeded random is to ensure that all players have an equal playing field.
+// It is necessary to change the seed for each puzzle.
+// from https://stackoverflow.com/a/19303725
+let SEED = 81;
+function seededRandom() {
+    var x = Math.sin(SEED++) * 10000;
+    return x - Math.floor(x);
+}
+
+const delay = ms => new Promise(res => setTimeout(res, ms));
+
+function revealCategory(cat) {
+    revealTerms = cat.terms();
+    rows = Array.from(document.getElementsByClassName("unrevealed"));
+    targetRow = rows.shift();
+
+    resetCells();
+
+    // swap cells
+    otherCells = []
+    for (row of rows) {
+        cells = Array.from(row.children);
+        otherCells = [...otherCells, ...cells]
+    }
+
+    for (const cell of Array.from(targetRow.children)) {
+        if (!cat.items.has(cell.innerHTML)) {
+            for (const other of otherCells) {
+                if (cat.items.has(other.innerHTML)) {
+                    swapElements(cell, other);
+                }
+            }
+        }
+    }
+
+    placeBanner(targetRow, cat);
+}
+
+function swapElements(obj1, obj2) {
+    // create marker element and insert it where obj1 is
+    var temp = document.createElement("div");
+    obj1.parentNode.insertBefore(temp, obj1);
+
+    // move obj1 to right before obj2
+    obj2.parentNode.insertBefore(obj1, obj2);
+
+    // move obj2 to right before where obj1 used to be
+    temp.parentNode.insertBefore(obj2, temp);
+
+    // remove temporary marker node
+    temp.parentNode.removeChild(temp);
+}
+
+function removeAllChildren(elem) {
+    while (elem.hasChildNodes()) {
+        elem.removeChild(elem.firstChild);
+    }
+}
+
+function placeBanner(row, cat) {
+    let catBanner = document.createElement('td');
+    catBanner.innerHTML = cat.name + "<br />" + cat.toString();
+    catBanner.style.background = cat.color;
+    catBanner.colSpan = "4";
+    row.className = "game-row revealed";
+    removeAllChildren(row)
+    row.appendChild(catBanner);
+}
+
+function resetCells() {
+    terms.clear();
+    let cells = Array.from(document.getElementsByClassName("selected"));
+    cells.forEach((cell) => cell.className = "tile unselected ");
+}
+
+const purple = "mediumpurple";
+const blue = "deepskyblue";
+const green = "springgreen"
+const yellow = "gold";
+
+
+const COLORS = [purple, blue, green, yellow];
+
+const terms = new Set();
+let CATS = [];
+
+// The puzzle named in the page's query string: `?seed=<seed>` or `?index=<index>` (0 by default).
+// PUZZLES (from puzzles.js) holds [seed, [[category name, [term, ...]], ...]] for each puzzle.
+function selectPuzzle(puzzles) {
+    const params = new URLSearchParams(window.location.search);
+    if (params.has("seed")) {
+        const seed = Number(params.get("seed"));
+        const index = puzzles.findIndex((p) => p[0] == seed);
+        if (index >= 0) {
+            return index;
+        }
+    }
+    const index = Number(params.get("index")) || 0;
+    return Math.min(Math.max(index, 0), puzzles.length - 1);
+}
+
+function showNavigation(index, count) {
+    const nav = document.getElementById("puzzle-nav");
+    if (!nav) {
+        return;
+    }
+    let html = "Puzzle " + (index + 1) + " of " + count;
+    if (index > 0) {
+        html = '<a href="?index=' + (index - 1) + '">&larr;</a> ' + html;
+    }
+    if (index + 1 < count) {
+        html += ' <a href="?index=' + (index + 1) + '">&rarr;</a>';
+    }
+    nav.innerHTML = html;
+}
+
+function loadPuzzle(puzzles) {
+    const index = selectPuzzle(puzzles);
+    const [seed, categories] = puzzles[index];
+    SEED = seed;
+    CATS = categories.map(([name, items], i) => new Category(COLORS[i % COLORS.length], name, new Set(items)));
+    showNavigation(index, puzzles.length);
+    setUp(CATS);
+}
+
+loadPuzzle(PUZZLES);
@@ -0,0 +1,194 @@
+"""
+An index of which (word, relation, anchor) categories can actually make a puzzle.
+
+`random_category` picks a relation and anchor blindly and retries when ConceptNet
+has fewer than 4 terms for it, so most lookups are wasted. The index records how many
+usable English terms each (word in `WORDS`, rel in `RELS`, anchor) triple has, so
+generation can pick only triples that work and needs one lookup per category.
+
+The index is a JSON file next to the ConceptNet cache. Refreshing it only looks up
+triples it doesn't have yet (e.g. after adding words) or, with `max_age`, older ones.
+
+Usage:
+`python -m connections.viability [--max-age <days>] [--workers <n>] [--offline | --db <file>]`
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from random import choice, sample, shuffle
+
+from conceptnet.cache import default_path
+from conceptnet.scheduler import BACKGROUND
+from . import connections
+from .connections import RELS, WORDS, remove_word
+
+ANCHORS = ('start', 'end')
+# How many terms a category needs.
+MIN_TERMS = 4
+
+
+def default_index_path() -> str:
+    """`viability.json`, in the same directory as the ConceptNet cache."""
+    return os.path.join(os.path.dirname(default_path()), 'viability.json')
+
+
+def count_terms(word: str, anchor: str, rel: str, verbose: bool = False) -> int:
+    """How many distinct English terms (not containing `word`) are related to `word` by `rel`."""
+    if anchor == 'start':
+        edges = connections.conceptnet_edges(start=word, rel=rel, verbose=verbose)
+        other = 'end'
+    else:
+        edges = connections.conceptnet_edges(end=word, rel=rel, verbose=verbose)
+        other = 'start'
+    terms = set()
+    for edge in edges:
+        node = edge.node(other)
+        if node.language == 'en':
+            terms.update(remove_word(word, [node.label]))
+    return len(terms)
+
+
+class ViabilityIndex:
+    """
+    Term counts for (word, anchor, rel) triples, with when each was looked up.
+
+    Params:
+        path: The JSON file the index is kept in.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or default_index_path()
+        # (word, anchor, rel) -> (term count, time looked up)
+        self.entries = {}
+
+    @classmethod
+    def load(cls, path: str = None):
+        """The index at `path`, or an empty one if there isn't one yet."""
+        index = cls(path)
+        if os.path.exists(index.path):
+            with open(index.path, encoding='utf-8') as f:
+                for key, (count, when) in json.load(f).items():
+                    index.entries[tuple(key.split('\t'))] = (count, when)
+        return index
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        data = {'\t'.join(key): value for key, value in self.entries.items()}
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def count(self, word: str, anchor: str, rel: str):
+        """The term count for a triple, or `None` if it hasn't been looked up."""
+        entry = self.entries.get((word, anchor, rel))
+        return None if entry is None else entry[0]
+
+    def record(self, word: str, anchor: str, rel: str, count: int) -> None:
+        self.entries[word, anchor, rel] = (count, time.time())
+
+    def stale(self, wordlist=WORDS, rels=RELS, max_age: float = None) -> list:
+        """The triples that are missing, or were looked up more than `max_age` seconds ago."""
+        now = time.time()
+        triples = []
+        for word in wordlist:
+            for rel in rels:
+                for anchor in ANCHORS:
+                    entry = self.entries.get((word, anchor, rel))
+                    if entry is None or (max_age is not None and now - entry[1] > max_age):
+                        triples.append((word, anchor, rel))
+        return triples
+
+    def refresh(self, wordlist=WORDS, rels=RELS, max_age: float = None, max_workers: int = 8,
+                verbose: bool = False) -> int:
+        """
+        Look up the stale triples (see `stale`), `max_workers` at a time, and save the index.
+        Returns how many triples were looked up.
+        """
+        triples = self.stale(wordlist, rels, max_age)
+        if not triples:
+            return 0
+        with ThreadPoolExecutor(max_workers) as pool:
+            counts = pool.map(lambda triple: count_terms(*triple), triples)
+            for i, (triple, count) in enumerate(zip(triples, counts), 1):
+                self.record(*triple, count)
+                if verbose and i % 100 == 0:
+                    print(f'{i}/{len(triples)} looked up', end='\r')
+        self.save()
+        if verbose:
+            print(f'{len(triples)} looked up, {len(self.viable_words(wordlist, rels))} viable words')
+        return len(triples)
+
+    def viable(self, word: str, rels=RELS) -> list:
+        """The (anchor, rel) pairs with enough terms for a category about `word`."""
+        return [(anchor, rel) for rel in rels for anchor in ANCHORS
+                if (self.count(word, anchor, rel) or 0) >= MIN_TERMS]
+
+    def viable_words(self, wordlist=WORDS, rels=RELS) -> list:
+        return [word for word in wordlist if self.viable(word, rels)]
+
+
+def viable_category(index: ViabilityIndex, word: str, rels=RELS, verbose: bool = False):
+    """
+    A random category about `word` from its viable triples, or `None` if none of them
+    has enough terms any more (each one that doesn't is corrected in the index).
+    """
+    options = index.viable(word, rels)
+    while options:
+        anchor, rel = choice(options)
+        terms = connections.category_terms(word, anchor, rel, verbose=verbose)
+        if len(terms) >= MIN_TERMS:
+            shuffle(terms)
+            return word, anchor, rel, terms
+        # ConceptNet changed since the index was built.
+        index.record(word, anchor, rel, len(terms))
+        options.remove((anchor, rel))
+    return None
+
+
+def connections_from_index(index: ViabilityIndex, wordlist: list = WORDS, rels=RELS, k: int = 4,
+                           verbose: bool = False) -> list:
+    """
+    Like `connections.connections`, but only picks categories the index says are viable,
+    so each category takes one lookup unless the index is out of date.
+    """
+    words = index.viable_words(wordlist, rels)
+    if len(words) < k:
+        raise RuntimeError(f'Only {len(words)} viable words; refresh the index or add words.')
+    cats = []
+    for word in sample(words, len(words)):
+        cat = viable_category(index, word, rels, verbose=verbose)
+        if cat is not None:
+            cats.append(cat)
+            if len(cats) == k:
+                return cats
+    raise RuntimeError('Not enough viable words; refresh the index.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or refresh the Connections viability index.')
+    parser.add_argument('--max-age', type=float, default=None, metavar='DAYS',
+                        help='also look up triples older than this')
+    parser.add_argument('--workers', type=int, default=8, help='ConceptNet requests to run at once')
+    parser.add_argument('--index', metavar='FILE', help=f'the index file (default: {default_index_path()})')
+    parser.add_argument('--offline', action='store_true', help='only use cached ConceptNet responses')
+    parser.add_argument('--db', metavar='FILE',
+                        help='answer queries from a local ConceptNet database (see conceptnet/offline.py)')
+    args = parser.parse_args()
+    connections.CACHE.offline = args.offline
+    if args.db:
+        connections.CLIENT = connections.OfflineConceptNet(args.db)
+    else:
+        # Keeping the index fresh can wait for anyone playing.
+        connections.CLIENT.priority = BACKGROUND
+
+    index = ViabilityIndex.load(args.index)
+    max_age = args.max_age * 24 * 60 * 60 if args.max_age is not None else None
+    start = time.time()
+    looked_up = index.refresh(max_age=max_age, max_workers=args.workers, verbose=True)
+    print(f'{len(index)} triples in {index.path}; {looked_up} looked up in {time.time() - start:.1f}s')
@@ -0,0 +1,231 @@
+"""
+Lightweight instrumentation shared by the games: counters and latency histograms.
+
+Nothing is recorded unless metrics are enabled, either with `enable()` or by setting
+`NLPGAMES_METRICS` before starting a game:
+
+    NLPGAMES_METRICS=1             print the metrics as JSON to stderr at exit
+    NLPGAMES_METRICS=metrics.json  write them to a file at exit (JSON)
+    NLPGAMES_METRICS=metrics.prom  write them to a file at exit (Prometheus text format)
+
+When disabled, `observe`, `inc` and `set_gauge` return immediately; hot paths check
+`metrics.ENABLED` themselves so they don't even read the clock.
+
+Metrics recorded:
+
+    conceptnet_request_seconds        histogram, per backend (http, offline)
+    conceptnet_response_bytes_total   counter
+    conceptnet_retries_total          counter
+    conceptnet_cache_requests_total   counter, per result (hit, miss)
+    conceptnet_queue_depth            gauge: requests waiting for the scheduler's rate limit
+    conceptnet_schedule_wait_seconds  histogram, per priority (interactive, background, batch)
+    conceptnet_coalesced_total        counter: requests that joined an identical one in flight
+    tree_build_seconds                histogram, per phase of building a 20q tree
+    tree_load_seconds                 histogram, per source (snapshot, build)
+    twentyq_turn_seconds              histogram, per mode (cli, server): from an answer to the next question
+"""
+
+import os
+import sys
+import threading
+
+ENABLED = False
+
+# Upper bounds (in seconds) of the histogram buckets; there is always a last, unbounded one.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+# (name, ((label, value), ...)) -> Histogram or number
+_histograms = {}
+_counters = {}
+_gauges = {}
+_exit_path = None
+
+
+class Histogram:
+    """Counts of observations per bucket, with their sum."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """An estimate of the `q` quantile: the upper bound of the bucket it falls in."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Add an observation (usually seconds) to a histogram."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """Add to a counter."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """Set a gauge, a value that goes up and down (e.g. a queue's length)."""
+    if not ENABLED:
+        return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def enable(path: str = None) -> None:
+    """
+    Start recording. With `path`, the metrics are written there at exit
+    (`-` for stderr; Prometheus text if it ends in `.prom`, JSON otherwise).
+    """
+    global ENABLED, _exit_path
+    ENABLED = True
+    if path and _exit_path is None:
+        import atexit
+        atexit.register(lambda: dump(_exit_path))
+    if path:
+        _exit_path = path
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def _labelled(key: tuple) -> dict:
+    name, labels = key
+    return {'name': name, 'labels': dict(labels)}
+
+
+def _bound(value: float):
+    """A bucket bound as JSON allows it: the last, unbounded bucket is `+Inf`, like its key in `buckets`."""
+    return '+Inf' if value == float('inf') else value
+
+
+def snapshot() -> dict:
+    """Everything recorded so far, as plain data."""
+    with _lock:
+        histograms = [{
+            **_labelled(key),
+            'count': h.count,
+            'sum': h.sum,
+            'p50': _bound(h.quantile(0.5)),
+            'p99': _bound(h.quantile(0.99)),
+            'buckets': dict(zip([str(b) for b in h.buckets] + ['+Inf'], h.counts)),
+        } for key, h in sorted(_histograms.items())]
+        counters = [{**_labelled(key), 'value': value} for key, value in sorted(_counters.items())]
+        gauges = [{**_labelled(key), 'value': value} for key, value in sorted(_gauges.items())]
+    hits = sum(c['value'] for c in counters
+               if c['name'] == 'conceptnet_cache_requests_total' and c['labels'].get('result') == 'hit')
+    lookups = sum(c['value'] for c in counters if c['name'] == 'conceptnet_cache_requests_total')
+    return {
+        'histograms': histograms,
+        'counters': counters,
+        'gauges': gauges,
+        'cache_hit_rate': hits / lookups if lookups else None,
+    }
+
+
+def to_json() -> str:
+    import json
+    return json.dumps(snapshot(), indent=1)
+
+
+def _prometheus_labels(labels: dict, **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+
+
+def to_prometheus() -> str:
+    """Everything recorded so far, in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = []
+    typed = set()
+    for h in data['histograms']:
+        name, labels = h['name'], h['labels']
+        if name not in typed:
+            lines.append(f'# TYPE {name} histogram')
+            typed.add(name)
+        total = 0
+        for bound, count in h['buckets'].items():
+            total += count
+            lines.append(f'{name}_bucket{_prometheus_labels(labels, le=bound)} {total}')
+        lines.append(f'{name}_sum{_prometheus_labels(labels)} {h["sum"]}')
+        lines.append(f'{name}_count{_prometheus_labels(labels)} {h["count"]}')
+    for kind in ('counter', 'gauge'):
+        for c in data[kind + 's']:
+            name = c['name']
+            if name not in typed:
+                lines.append(f'# TYPE {name} {kind}')
+                typed.add(name)
+            lines.append(f'{name}{_prometheus_labels(c["labels"])} {c["value"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def dump(path: str = '-') -> None:
+    """Write the metrics to `path` (`-` for stderr): Prometheus text if it ends in `.prom`, JSON otherwise."""
+    text = to_prometheus() if path.endswith('.prom') else to_json() + '\n'
+    if path == '-':
+        sys.stderr.write(text)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def dump_on_signal(loop, path: str = '-') -> None:
+    """
+    Dump the metrics to `path` whenever the process gets SIGUSR1 (where there is one).
+    The dump runs as a callback on the asyncio `loop`, not inside a signal handler,
+    which could interrupt code holding the metrics lock and wait on it forever.
+    """
+    import signal
+    if hasattr(signal, 'SIGUSR1'):
+        loop.add_signal_handler(signal.SIGUSR1, dump, path)
+
+
+_env = os.environ.get('NLPGAMES_METRICS')
+if _env:
+    enable('-' if _env == '1' else _env)
@@ -0,0 +1,4 @@
+"""
+Relationle: guess a word from its ConceptNet relations.
+Run from the repository root, e.g. `python -m relationle.generator`.
+"""
@@ -0,0 +1,93 @@
+"""
+Benchmark for `index.py`: 1- to 10-clause evaluations, set-based vs. the inverted index.
+
+Clause results are synthetic, with sizes spread log-uniformly over `--min-size` to
+`--max-size` words out of a `--vocab`-word vocabulary, so some are stored as bitmaps.
+Every definition's clauses share a target word, so intersections are never trivially empty.
+
+Three ways of evaluating a definition are timed:
+
+- labels:  normalize each clause's labels into a set, then intersect (`Definition.evaluate` before `clauses.py`)
+- sets:    intersect remembered sets of words (`ClauseEvaluator` once its results are cached)
+- index:   intersect integer id lists and bitmaps (`InvertedIndex`)
+
+Usage:
+`python -m relationle.bench_index [--vocab <n>] [--definitions <n>] [--seed <seed>]`
+"""
+
+import argparse
+import math
+import random
+import time
+
+from .clauses import normalize
+from .index import InvertedIndex
+
+MAX_CLAUSES = 10
+
+
+def synthetic(rng: random.Random, args):
+    """A vocabulary, and per definition: MAX_CLAUSES clause keys and each one's labels."""
+    vocab = [f'word{i}' for i in range(args.vocab)]
+    definitions = []
+    for d in range(args.definitions):
+        target = rng.choice(vocab)
+        clauses = []
+        for c in range(MAX_CLAUSES):
+            size = int(math.exp(rng.uniform(math.log(args.min_size), math.log(args.max_size))))
+            labels = [f'a {w}' for w in rng.sample(vocab, size)] + [target]
+            clauses.append(((f'Rel{c}', f'term{d}', 'end'), labels))
+        definitions.append(clauses)
+    return vocab, definitions
+
+
+def timed(evaluate, definitions, k: int) -> float:
+    """Microseconds per evaluation of the first `k` clauses of each definition."""
+    start = time.perf_counter()
+    for clauses in definitions:
+        evaluate(clauses[:k])
+    return (time.perf_counter() - start) / len(definitions) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark Relationle clause evaluation.')
+    parser.add_argument('--vocab', type=int, default=200_000)
+    parser.add_argument('--definitions', type=int, default=100)
+    parser.add_argument('--min-size', type=int, default=20)
+    parser.add_argument('--max-size', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab, definitions = synthetic(rng, args)
+
+    index = InvertedIndex()
+    for word in vocab:
+        index.intern(word)
+    sets = {}
+    for clauses in definitions:
+        for key, labels in clauses:
+            words = frozenset(normalize(label) for label in labels)
+            sets[key] = words
+            index.add(key, words)
+    dense = sum(isinstance(p, bytes) for p in index.postings)
+    print(f'{len(index)} clauses over {args.vocab} words, {dense} stored as bitmaps')
+
+    def by_labels(clauses):
+        return set.intersection(*(set(normalize(label) for label in labels) for _, labels in clauses))
+
+    def by_sets(clauses):
+        return set.intersection(*(set(sets[key]) for key, _ in clauses[:1]), *(sets[key] for key, _ in clauses[1:]))
+
+    def by_index(clauses):
+        return index.evaluate([key for key, _ in clauses])
+
+    for clauses in definitions[:20]:
+        assert by_labels(clauses) == by_sets(clauses) == by_index(clauses)
+
+    print(f'{"clauses":>7} {"labels us":>12} {"sets us":>12} {"index us":>12} {"speedup":>8}')
+    for k in range(1, MAX_CLAUSES + 1):
+        labels_us = timed(by_labels, definitions, k)
+        sets_us = timed(by_sets, definitions, k)
+        index_us = timed(by_index, definitions, k)
+        print(f'{k:>7} {labels_us:>12.1f} {sets_us:>12.1f} {index_us:>12.1f} {sets_us / index_us:>7.1f}x')
@@ -0,0 +1,87 @@
+"""
+Evaluating Relationle definitions: the set of words that satisfy every clause.
+
+A clause is a (query URL, known side) pair from `QueryBuilder.clause`: the words it
+allows are the normalized labels at the other side of the query's edges.
+
+`ClauseEvaluator` sends all of a definition's clause queries at once, intersects the
+results as they come in (smallest first), and stops as soon as the intersection is
+empty. Each clause's result is remembered, so a clause reused in a later guess
+costs nothing.
+"""
+
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def normalize(word: str) -> str:
+    word = word.lower()
+    word = re.sub('^an? ', '', word)
+    return word
+
+
+class ClauseEvaluator:
+    """
+    Evaluates clauses against ConceptNet, concurrently and with memoized results.
+
+    Params:
+        client: A `ConceptNetClient` (or `OfflineConceptNet`).
+        max_workers: How many clause queries to run at once.
+        max_pages: How many pages of edges make up a clause's result.
+    """
+    def __init__(self, client, max_workers: int = 8, max_pages: int = 1):
+        self.client = client
+        self.max_pages = max_pages
+        self.pool = ThreadPoolExecutor(max_workers)
+        # (URL, known side) -> Future of the clause's frozenset of words.
+        # Futures rather than results, so a clause already being fetched isn't fetched twice.
+        self._results = {}
+
+    def words(self, clause) -> frozenset:
+        """The normalized words a single clause allows."""
+        url, known = clause
+        target = 'start' if known == 'end' else 'end'
+        return frozenset(normalize(edge.node(target).label)
+                         for edge in self.client.edge_records(url, max_pages=self.max_pages))
+
+    def _future(self, clause):
+        key = tuple(clause)
+        future = self._results.get(key)
+        if future is None:
+            future = self._results[key] = self.pool.submit(self.words, clause)
+
+            def forget_failure(f):
+                # Don't remember failures; the next evaluation will try again.
+                if f.cancelled() or f.exception() is not None:
+                    self._results.pop(key, None)
+            future.add_done_callback(forget_failure)
+        return future
+
+    def words_of(self, clauses) -> list:
+        """The words each clause allows, fetching the ones not remembered yet all at once."""
+        return [future.result() for future in [self._future(clause) for clause in clauses]]
+
+    def evaluate(self, clauses) -> set:
+        """
+        The words allowed by every clause.
+        Returns as soon as the answer is known to be empty; queries still running are kept for later.
+        """
+        if not clauses:
+            return set()
+        pending = {self._future(clause) for clause in clauses}
+        result = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Several may be ready at once (e.g. remembered ones): intersect the smallest first.
+            for words in sorted((f.result() for f in done), key=len):
+                result = set(words) if result is None else result.intersection(words)
+                if not result:
+                    return result
+        return result
+
+    def forget(self) -> None:
+        """Drop every remembered clause result."""
+        self._results.clear()
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
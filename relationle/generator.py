@@ -0,0 +1,223 @@
+"""
+Finds Relationle definitions: the fewest clauses whose words are exactly one target word.
+
+The candidate clauses are the target's ConceptNet neighbourhood: every edge
+`target -rel-> other` gives the clause "rel, end = other", and every edge
+`other -rel-> target` gives "rel, start = other". A definition wins when the
+intersection of its clauses' words is just the target (see `Definition.evaluate`),
+so every other word must be missing from at least one chosen clause.
+
+That is a hitting set problem, solved by branch and bound over bitmasks of the
+candidates' words: a greedy definition sets the first bound, and each branch picks a
+word that is still in the intersection and tries only the clauses that rule it out,
+preferring the word the fewest clauses rule out.
+
+Usage:
+`python -m relationle.generator <word list file> [-o definitions.jsonl] [--max-clauses <n>] [--offline | --db <file>]`
+writes one definition per line for each word that has one, e.g.
+
+    {"word": "lion", "clauses": [["IsA", "feline", "end"], ["AtLocation", "zoo", "end"]], "candidates": 38}
+"""
+
+import argparse
+import json
+import os
+import time
+
+from .clauses import ClauseEvaluator, normalize
+from .index import _term
+
+# Don't look for definitions longer than this.
+MAX_CLAUSES = 4
+# How many words in the intersection to consider when choosing which one to rule out next.
+BRANCH_SAMPLE = 16
+
+
+def _mask(bits, size: int) -> int:
+    """The integer with the given bits set, out of `size`."""
+    mask = bytearray((size + 7) // 8)
+    for i in bits:
+        mask[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(mask, 'little')
+
+
+class Generator:
+    """
+    Searches for minimal definitions, using `evaluator` for (and to remember) every clause's words.
+
+    Params:
+        evaluator: The `ClauseEvaluator` the game itself uses, so definitions are judged the same way.
+        rels: Only use these relations, e.g. `('IsA', 'PartOf')`; all of them by default.
+        max_pages: How many pages of the target's edges to read for candidates.
+    """
+    def __init__(self, evaluator: ClauseEvaluator, rels=None, max_pages: int = 5):
+        self.evaluator = evaluator
+        self.client = evaluator.client
+        self.rels = None if rels is None else set(rels)
+        self.max_pages = max_pages
+
+    def clause(self, key: tuple) -> tuple:
+        """The (query URL, known side) clause for a (rel, term, known side) key."""
+        rel, term, known = key
+        return self.client.query_url(rel=rel, **{known: term}), known
+
+    def neighbourhood(self, target: str) -> list:
+        """The keys of the clauses built from the target's edges."""
+        keys = set()
+        for side, known in (('start', 'end'), ('end', 'start')):
+            url = self.client.query_url(**{side: target})
+            for edge in self.client.edge_records(url, max_pages=self.max_pages):
+                rel = edge.rel_label
+                other = edge.node(known)
+                # Only English terms: `ExternalURL` edges end at web addresses, not `/c/` terms.
+                if rel == 'ExternalURL' or not other.uri.startswith('/c/en/'):
+                    continue
+                if self.rels is None or rel in self.rels:
+                    keys.add((rel, _term(other.uri), known))
+        return sorted(keys)
+
+    def candidates(self, target: str) -> dict:
+        """The neighbourhood's clause keys whose words include the target, with their words."""
+        keys = self.neighbourhood(target)
+        words = self.evaluator.words_of([self.clause(key) for key in keys])
+        word = normalize(target.replace('_', ' '))
+        return {key: ws for key, ws in zip(keys, words) if word in ws}
+
+    def define(self, target: str, max_clauses: int = MAX_CLAUSES):
+        """
+        The smallest list of clause keys that identifies `target`, or `None` if there is
+        none of at most `max_clauses` clauses. Also returns how many candidates there were.
+        """
+        candidates = self.candidates(target)
+        return minimal_definition(normalize(target.replace('_', ' ')), candidates, max_clauses), len(candidates)
+
+
+def minimal_definition(word: str, candidates: dict, max_clauses: int = MAX_CLAUSES):
+    """
+    The smallest list of keys of `candidates` (key -> set of words, each including `word`)
+    whose sets intersect to exactly {`word`}, or `None` if that takes more than `max_clauses`.
+    """
+    if not candidates:
+        return None
+    ids = {}
+    for words in candidates.values():
+        for w in words:
+            ids.setdefault(w, len(ids))
+    keys = list(candidates)
+    masks = [_mask((ids[w] for w in candidates[key]), len(ids)) for key in keys]
+    target = 1 << ids[word]
+    everything = (1 << len(ids)) - 1
+
+    # A greedy definition first, for a bound: keep taking the clause that leaves the fewest words.
+    # A definition needs at least one clause, even if every candidate allows only `word`.
+    best = None
+    current, chosen = everything, []
+    while (current != target or not chosen) and len(chosen) < max_clauses:
+        c = min(range(len(keys)), key=lambda c: (current & masks[c]).bit_count())
+        if chosen and current & masks[c] == current:
+            break
+        current &= masks[c]
+        chosen.append(c)
+    if chosen and current == target:
+        best = chosen
+    limit = len(best) if best is not None else max_clauses + 1
+
+    # The depth each intersection was first reached at; reaching one again no sooner is no use.
+    seen = {}
+
+    def search(current: int, chosen: list) -> None:
+        nonlocal best, limit
+        remaining = current & ~target
+        if not remaining and chosen:
+            best, limit = list(chosen), len(chosen)
+            return
+        if len(chosen) + 1 >= limit or seen.get(current, limit) <= len(chosen):
+            return
+        seen[current] = len(chosen)
+        if len(chosen) + 2 == limit:
+            # Only a single clause that rules out everything left can beat the best so far.
+            for c, mask in enumerate(masks):
+                if not mask & remaining:
+                    best, limit = chosen + [c], len(chosen) + 1
+                    return
+            return
+        # Bound: no clause rules out more than `most` of the remaining words.
+        ruled_out = [(remaining & ~mask).bit_count() for mask in masks]
+        most = max(ruled_out)
+        if not most or len(chosen) - (-remaining.bit_count() // most) >= limit:
+            return
+        # Branch on the word (among a few still in the intersection) the fewest clauses rule out.
+        options = None
+        sample = remaining
+        for _ in range(BRANCH_SAMPLE):
+            if not sample:
+                break
+            low = sample & -sample
+            sample ^= low
+            ruling_out = [c for c in range(len(keys)) if not masks[c] & low]
+            if options is None or len(ruling_out) < len(options):
+                options = ruling_out
+                if not options:
+                    # Nothing rules this word out: no definition down this branch.
+                    return
+        options.sort(key=lambda c: -ruled_out[c])
+        for c in options:
+            chosen.append(c)
+            search(current & masks[c], chosen)
+            chosen.pop()
+
+    search(everything, [])
+    return None if best is None else [keys[c] for c in best]
+
+
+def read_done(path: str) -> set:
+    """The words already in the output file, so a rerun picks up where the last one stopped."""
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)['word'])
+            except (json.JSONDecodeError, KeyError):
+                break
+    return done
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Find minimal Relationle definitions for a list of words.')
+    parser.add_argument('words', help='a file with one word per line')
+    parser.add_argument('-o', '--out', default='definitions.jsonl', help='the JSONL file to append to')
+    parser.add_argument('--max-clauses', type=int, default=MAX_CLAUSES)
+    parser.add_argument('--rel', action='append', help='only use these relations (default: all)')
+    parser.add_argument('--offline', action='store_true', help='only use cached ConceptNet responses')
+    parser.add_argument('--db', metavar='FILE',
+                        help='answer queries from a local ConceptNet database (see conceptnet/offline.py)')
+    args = parser.parse_args()
+
+    from conceptnet.cache import QueryCache
+    from conceptnet.client import ConceptNetClient
+    from conceptnet.offline import OfflineConceptNet
+    from conceptnet.scheduler import BATCH, default_scheduler
+
+    if args.db:
+        client = OfflineConceptNet(args.db)
+    else:
+        client = ConceptNetClient(cache=QueryCache(offline=args.offline), scheduler=default_scheduler(), priority=BATCH)
+    generator = Generator(ClauseEvaluator(client), rels=args.rel)
+
+    with open(args.words, encoding='utf-8') as f:
+        words = [line.strip().lower().replace(' ', '_') for line in f if line.strip()]
+    done = read_done(args.out)
+    found = 0
+    start = time.time()
+    with open(args.out, 'a', encoding='utf-8') as out:
+        for word in (w for w in words if w not in done):
+            keys, candidates = generator.define(word, args.max_clauses)
+            if keys is not None:
+                out.write(json.dumps({'word': word, 'clauses': keys, 'candidates': candidates}) + '\n')
+                out.flush()
+                found += 1
+            print(f'{word}: {len(keys) if keys else "no"} clauses from {candidates} candidates')
+    elapsed = time.time() - start
+    print(f'{found} definitions in {elapsed:.1f}s')
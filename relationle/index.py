@@ -0,0 +1,166 @@
+"""
+An inverted index for answering Relationle clauses locally, over integer word ids.
+
+Every normalized word is interned to an integer id. Each clause key,
+(relation, known term, known side), maps to the ids of the words it allows:
+
+- a sorted `array('I')` of ids when it allows few words, or
+- a bitmap over the whole vocabulary (one bit per id) when that is smaller,
+  i.e. when it allows more than 1 in 32 words.
+
+An evaluation intersects the smallest lists first, narrowing the candidates with
+sorted-list intersections and bitmap lookups; when every list is a bitmap, they are
+ANDed as big integers in one go.
+
+Build the index from a database made by `python -m conceptnet.offline`,
+or fill it clause by clause with `add`.
+"""
+
+import sqlite3
+from array import array
+from bisect import bisect_left
+from functools import reduce
+from urllib.parse import parse_qsl, urlsplit
+
+from .clauses import normalize
+
+# A list with more ids than this fraction of the vocabulary is stored as a bitmap.
+DENSE = 1 / 32
+
+
+def clause_key(clause) -> tuple:
+    """The index key of a (query URL, known side) clause from `QueryBuilder.clause`: (rel, term, side)."""
+    url, known = clause
+    params = dict(parse_qsl(urlsplit(url).query))
+    return params['rel'].rsplit('/', 1)[-1], _term(params[known]), known
+
+
+def _term(uri: str) -> str:
+    """`/c/en/ice_cream/n` -> `ice_cream`."""
+    parts = uri.split('/')
+    return parts[3] if len(parts) > 3 else uri
+
+
+def _intersect(ids, other) -> list:
+    """The ids in both sorted sequences; `ids` should be the shorter."""
+    if len(other) > 16 * len(ids):
+        # Much longer: binary search for each id instead of reading all of `other`.
+        found = []
+        lo = 0
+        for i in ids:
+            lo = bisect_left(other, i, lo)
+            if lo == len(other):
+                break
+            if other[lo] == i:
+                found.append(i)
+        return found
+    return sorted(set(ids).intersection(other))
+
+
+def _bits(x: int) -> list:
+    """The positions of the set bits of `x`, lowest first."""
+    digits = bin(x)[:1:-1]
+    found = []
+    i = digits.find('1')
+    while i >= 0:
+        found.append(i)
+        i = digits.find('1', i + 1)
+    return found
+
+
+class InvertedIndex:
+    """Maps clause keys to the ids of the words they allow."""
+    def __init__(self):
+        self.vocab = []
+        self.word_ids = {}
+        self.keys = {}
+        # Per key: a sorted array of ids, or the bytes of a little-endian bitmap.
+        self.postings = []
+        self.counts = array('I')
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def intern(self, word: str) -> int:
+        i = self.word_ids.get(word)
+        if i is None:
+            i = self.word_ids[word] = len(self.vocab)
+            self.vocab.append(word)
+        return i
+
+    def add(self, key: tuple, words) -> None:
+        """Store the words a clause key allows, replacing any already stored."""
+        self._store(key, sorted({self.intern(word) for word in words}))
+
+    def _store(self, key: tuple, ids: list) -> None:
+        if len(ids) > DENSE * len(self.vocab):
+            posting = bytearray((len(self.vocab) + 7) // 8)
+            for i in ids:
+                posting[i >> 3] |= 1 << (i & 7)
+            posting = bytes(posting)
+        else:
+            posting = array('I', ids)
+        slot = self.keys.get(key)
+        if slot is None:
+            self.keys[key] = len(self.postings)
+            self.postings.append(posting)
+            self.counts.append(len(ids))
+        else:
+            self.postings[slot] = posting
+            self.counts[slot] = len(ids)
+
+    @classmethod
+    def from_database(cls, path: str, rels=None):
+        """
+        The index of every clause answerable from an offline ConceptNet database,
+        optionally only for the relations in `rels` (e.g. `('IsA', 'PartOf')`).
+        """
+        db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        allowed = {}
+        index = cls()
+        rows = db.execute('SELECT rel, start, end, start_label, end_label FROM edges')
+        wanted = None if rels is None else {f'/r/{rel}' for rel in rels}
+        for rel, start, end, start_label, end_label in rows:
+            if wanted is not None and rel not in wanted:
+                continue
+            rel = rel.rsplit('/', 1)[-1]
+            allowed.setdefault((rel, _term(end), 'end'), set()).add(index.intern(normalize(start_label)))
+            allowed.setdefault((rel, _term(start), 'start'), set()).add(index.intern(normalize(end_label)))
+        db.close()
+        # Only now is the vocabulary complete, so only now can each list be sized against it.
+        for key, ids in allowed.items():
+            index._store(key, sorted(ids))
+        return index
+
+    def ids(self, keys) -> list:
+        """The sorted ids of the words every key allows."""
+        slots = []
+        for key in keys:
+            slot = self.keys.get(key)
+            if slot is None:
+                return []
+            slots.append(slot)
+        if not slots:
+            return []
+        slots.sort(key=self.counts.__getitem__)
+        sparse = [self.postings[s] for s in slots if isinstance(self.postings[s], array)]
+        dense = [self.postings[s] for s in slots if not isinstance(self.postings[s], array)]
+
+        if not sparse:
+            return _bits(reduce(int.__and__, (int.from_bytes(b, 'little') for b in dense)))
+        ids = sparse[0]
+        for posting in sparse[1:]:
+            if not ids:
+                return []
+            ids = _intersect(ids, posting)
+        for bitmap in dense:
+            ids = [i for i in ids if i >> 3 < len(bitmap) and bitmap[i >> 3] >> (i & 7) & 1]
+        return list(ids)
+
+    def evaluate(self, keys) -> set:
+        """The words every key allows."""
+        return set(map(self.vocab.__getitem__, self.ids(keys)))
+
+    def evaluate_clauses(self, clauses) -> set:
+        """The words every (query URL, known side) clause allows, like `ClauseEvaluator.evaluate`."""
+        return self.evaluate([clause_key(clause) for clause in clauses])